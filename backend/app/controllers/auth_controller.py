@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.services.auth_service import AuthService
-from app.core.security import validate_access_token
+from app.core.security import validate_access_token, token_cache
 from app.db import get_db
 from app.services.user_service import UserService
 from app.core.jwt_manager import JWTManager
@@ -27,6 +27,12 @@ def user_profile(user=Depends(validate_access_token)):
     return user
 
 
+@router.get("/token-cache/stats")
+def token_cache_stats():
+    """Hit/miss counters for the verified-token cache"""
+    return token_cache.stats()
+
+
 @router.post("/debug/token/{user_id}")
 def create_debug_token(user_id: int, db: Session = Depends(get_db)):
     """DEV only: create an access token for a user id for testing.
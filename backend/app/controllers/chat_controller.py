@@ -3,40 +3,85 @@ from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from app.core.security import validate_access_token
 from app.services.chat_service import ChatService
-import json
+from app.services.chat_context import context_metrics, conversation_key
+from app.services.conversation_service import ConversationService
+from app.utils.fast_json import ndjson_line
+from typing import Optional
+import asyncio
 
 router = APIRouter()
 
 class ChatRequest(BaseModel):
     message: str
     history: list[dict] = []  # [{"role": "user"|"assistant", "content": "..."}]
+    # Server-side session from POST /chat/conversations; when set, history is
+    # loaded on the server and the client sends only the new message
+    conversation_id: Optional[str] = None
+
+
+@router.post("/conversations", status_code=201)
+async def create_conversation(user=Depends(validate_access_token)):
+    """Start a server-side conversation for the current user"""
+    conversation_id = await asyncio.to_thread(ConversationService.create, user.get("user_id"))
+    return {"conversation_id": conversation_id}
+
+
+@router.get("/conversations/{conversation_id}")
+async def get_conversation(conversation_id: str, user=Depends(validate_access_token)):
+    """Get the stored messages of one of the current user's conversations"""
+    messages = await asyncio.to_thread(ConversationService.get_history, conversation_id, user.get("user_id"))
+    return {"conversation_id": conversation_id, "messages": messages}
+
 
 @router.post("/chat")
 async def chat_with_llm(request: ChatRequest, user=Depends(validate_access_token)):
     if not request.message:
         raise HTTPException(status_code=400, detail="Message is required.")
-    
+
+    user_id = user.get("user_id")
+    history = request.history
+    if request.conversation_id:
+        history = await asyncio.to_thread(ConversationService.get_history, request.conversation_id, user_id)
+
     async def stream_generator():
         """Stream response chunks from ChatService and format as JSON lines."""
         try:
             response_text = ""
             alert = False
             
-            async for chunk in ChatService.chat(request.message, request.history):
+            key = conversation_key(user_id, request.conversation_id, history)
+            async for chunk in ChatService.chat(request.message, history, key):
                 # Check if this is the alert marker
                 if chunk.startswith("|ALERT|"):
                     alert_str = chunk.split("|")[2]
-                    alert = alert_str == "true"
+                    if alert_str == "true" and not alert:
+                        # Surface crisis signals as soon as they are detected, not at the end
+                        yield ndjson_line({"text": "", "done": False, "alert": True})
+                    alert = alert or alert_str == "true"
                     continue
                 
                 response_text += chunk
                 # Yield each chunk as a JSON line for the frontend
-                yield json.dumps({"text": chunk, "done": False}) + "\n"
+                yield ndjson_line({"text": chunk, "done": False})
             
+            final = {"text": "", "done": True, "alert": alert}
+            if request.conversation_id:
+                # Store both sides only once the exchange has completed
+                await asyncio.to_thread(
+                    ConversationService.append_exchange,
+                    request.conversation_id, user_id, request.message, response_text,
+                )
+                final["conversation_id"] = request.conversation_id
+
             # Send final response with alert flag
-            yield json.dumps({"text": "", "done": True, "alert": alert}) + "\n"
+            yield ndjson_line(final)
         except Exception as e:
-            yield json.dumps({"error": str(e)}) + "\n"
+            yield ndjson_line({"error": str(e)})
     
     return StreamingResponse(stream_generator(), media_type="application/x-ndjson")
 
+
+@router.get("/metrics")
+def chat_metrics(user=Depends(validate_access_token)):
+    """Prompt tokens saved by history windowing since process start"""
+    return context_metrics.snapshot()
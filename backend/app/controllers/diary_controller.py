@@ -1,7 +1,14 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.db import get_db
-from app.services.diary_service import DiaryService
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.core.config import settings
+from app.db import get_async_db, AsyncSessionLocal
+from app.services.diary_service import AsyncDiaryService, RANGE_FIELDS
+from app.services.user_service import AsyncUserService
+from app.utils.record_stream import iter_csv_records, iter_ndjson_records
+from app.utils.http_cache import conditional, make_etag
+from app.utils.fast_json import ndjson_line
 from app.schemas import DiaryCreate, DiaryUpdate, DiaryResponse, DiaryDatesResponse
 from datetime import date
 from fastapi import HTTPException
@@ -10,32 +17,135 @@ router = APIRouter()
 
 
 @router.post("/", response_model=DiaryResponse, status_code=201)
-def create_diary_entry(diary: DiaryCreate, db: Session = Depends(get_db)):
+async def create_diary_entry(diary: DiaryCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a diary entry for a user and date"""
-    entry = DiaryService.create_entry(db, diary)
+    entry = await AsyncDiaryService.create_entry(db, diary)
     return entry
 
 
 @router.put("/{entry_id}", response_model=DiaryResponse)
-def update_diary_entry(entry_id: int, diary_update: DiaryUpdate, db: Session = Depends(get_db)):
+async def update_diary_entry(entry_id: int, diary_update: DiaryUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update an existing diary entry by ID"""
-    entry = DiaryService.update_entry(db, entry_id, diary_update)
+    entry = await AsyncDiaryService.update_entry(db, entry_id, diary_update)
     return entry
 
 
+@router.delete("/{entry_id}", status_code=204)
+async def delete_diary_entry(entry_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Delete a diary entry by ID"""
+    await AsyncDiaryService.delete_entry(db, entry_id)
+    return None
+
+
+async def diary_not_modified(request: Request, response: Response, db: AsyncSession, user_id: int, *resource):
+    """304 if the user's diary hasn't changed since the client's copy of this resource.
+
+    Only the version ETag is used: Last-Modified has one-second resolution, so
+    If-Modified-Since would answer 304 after a write in the same second.
+    """
+    version = await AsyncDiaryService.get_version(db, user_id)
+    return conditional(request, response, make_etag("diary", user_id, version, *resource))
+
+
 @router.get("/dates/{user_id}", response_model=DiaryDatesResponse)
-def get_diary_dates(user_id: int, db: Session = Depends(get_db)):
+async def get_diary_dates(user_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     """Get all dates for which the user has diary entries"""
-    dates = DiaryService.get_dates_for_user(db, user_id)
+    not_modified = await diary_not_modified(request, response, db, user_id, "dates")
+    if not_modified:
+        return not_modified
+    dates = await AsyncDiaryService.get_dates_for_user(db, user_id)
     return {"dates": dates}
 
 
+@router.get("/range/{user_id}")
+async def get_diary_range(
+    user_id: int,
+    start: Optional[date] = Query(None, alias="from", description="First date, inclusive"),
+    end: Optional[date] = Query(None, alias="to", description="Last date, inclusive"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of {', '.join(RANGE_FIELDS)}"),
+    truncate: Optional[int] = Query(None, ge=1, description="Cut content to this many characters"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Entries between two dates in one query, paginated by (date, id) keyset cursor"""
+    selected = RANGE_FIELDS
+    if fields:
+        selected = tuple(f.strip() for f in fields.split(",") if f.strip())
+        unknown = set(selected) - set(RANGE_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return await AsyncDiaryService.get_range(db, user_id, start, end, cursor, limit, selected, truncate)
+
+
+@router.get("/calendar/{user_id}")
+async def get_diary_calendar(
+    user_id: int,
+    year: Optional[int] = Query(None, ge=1, le=9999),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Month-by-month entry counts; fetch a month's days with /range?fields=date"""
+    months = await AsyncDiaryService.get_calendar(db, user_id, year)
+    return {"months": months}
+
+
+@router.post("/import/{user_id}")
+async def import_diary_entries(
+    user_id: int,
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Bulk import entries from an NDJSON or CSV request body (fields: date, content).
+
+    The body is parsed as it arrives and upserted in batches; an existing
+    entry for the same date is overwritten. Format defaults from Content-Type.
+    """
+    await AsyncUserService.get_user_by_id(db, user_id)
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    parse = iter_csv_records if format == "csv" else iter_ndjson_records
+    return await AsyncDiaryService.import_entries(db, user_id, parse(request.stream()))
+
+
+@router.get("/export/{user_id}")
+async def export_diary_entries(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Stream all of a user's entries as NDJSON, oldest first"""
+    await AsyncUserService.get_user_by_id(db, user_id)
+
+    async def ndjson_lines():
+        # The request's session may be closed before streaming ends, so use a dedicated one
+        async with AsyncSessionLocal() as export_db:
+            async for entry in AsyncDiaryService.stream_entries(export_db, user_id, settings.DIARY_EXPORT_CHUNK_SIZE):
+                yield ndjson_line({
+                    "date": entry.date,
+                    "content": entry.content,
+                    "created_at": entry.created_at,
+                    "updated_at": entry.updated_at,
+                })
+
+    return StreamingResponse(
+        ndjson_lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="diary-{user_id}.ndjson"'},
+    )
+
+
 @router.get("/{user_id}/{entry_date}", response_model=DiaryResponse)
-def get_diary_by_date(user_id: int, entry_date: str, db: Session = Depends(get_db)):
+async def get_diary_by_date(
+    user_id: int,
+    entry_date: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
     """Get diary content for a specific user and date. Date format: YYYY-MM-DD"""
     try:
         d = date.fromisoformat(entry_date)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-    entry = DiaryService.get_entry_by_user_and_date(db, user_id, d)
+    not_modified = await diary_not_modified(request, response, db, user_id, "entry", d)
+    if not_modified:
+        return not_modified
+    entry = await AsyncDiaryService.get_entry_by_user_and_date(db, user_id, d)
     return entry
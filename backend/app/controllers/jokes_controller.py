@@ -1,11 +1,22 @@
-from fastapi import APIRouter, Depends
+from datetime import date
+from fastapi import APIRouter, Depends, Request, Response
 from app.services.jokes_service import JokesService
 from app.core.security import validate_access_token
+from app.utils.http_cache import conditional, make_etag
 
 router = APIRouter()
 
 @router.get("/daily")
-def get_daily_joke(user=Depends(validate_access_token)):
+def get_daily_joke(request: Request, response: Response, user=Depends(validate_access_token)):
+    # The joke only changes at midnight, so the date is a complete validator
+    today = date.today()
+    not_modified = conditional(
+        request, response,
+        make_etag("daily-joke", today),
+        cache_control=f"private, max-age={JokesService.seconds_until_tomorrow()}",
+    )
+    if not_modified:
+        return not_modified
     return JokesService.get_daily_joke()
 
 @router.get("/random")
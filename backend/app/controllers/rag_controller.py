@@ -1,8 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.db import get_db
 from app.services.rag_service import RAGService
+from app.services.embedding_cache import embedding_cache
+from app.services.vector_cache import vector_cache
+from app.services.answer_cache import answer_cache
+from app.utils.fast_json import ndjson_line
 from pydantic import BaseModel
+from typing import Literal, Optional
+import asyncio
 
 router = APIRouter()
 
@@ -11,17 +18,65 @@ class RAGQuery(BaseModel):
     user_id: int
     question: str
     top_k: int = 5
+    bypass_cache: bool = False  # skip the semantic answer cache lookup and always ask the LLM
+    mode: Optional[Literal['vector', 'lexical', 'hybrid']] = None  # retrieval mode; defaults to RAG_RETRIEVAL_MODE (vector)
 
 
 @router.post('/index/{user_id}')
 def index_user(user_id: int, db: Session = Depends(get_db)):
     """Index all diary entries for a user (compute embeddings)."""
-    count = RAGService.index_user_diaries(db, user_id)
-    return {'indexed': count}
+    return RAGService.index_user_diaries(db, user_id)
 
 
 @router.post('/chat')
 def rag_chat(payload: RAGQuery, db: Session = Depends(get_db)):
     """Query user's diary entries with RAG and return assistant answer and sources"""
-    answer, contexts = RAGService.query_user_diaries(db, payload.user_id, payload.question, payload.top_k)
-    return {'answer': answer, 'contexts': contexts}
+    answer, contexts, cached = RAGService.query_user_diaries(
+        db, payload.user_id, payload.question, payload.top_k,
+        use_cache=not payload.bypass_cache, mode=payload.mode,
+    )
+    return {'answer': answer, 'contexts': contexts, 'cached': cached}
+
+
+@router.post('/chat/stream')
+async def rag_chat_stream(payload: RAGQuery, db: Session = Depends(get_db)):
+    """Stream a RAG answer as NDJSON: the retrieved sources first, then answer chunks"""
+    def prepare():
+        mode = RAGService.resolve_mode(db, payload.mode)
+        if not RAGService.uses_answer_cache(mode, payload.bypass_cache):
+            contexts = RAGService.retrieve_contexts(db, payload.user_id, payload.question, payload.top_k, mode)
+            return None, mode, None, contexts
+        key = RAGService.answer_cache_key(db, payload.user_id, payload.question)
+        hit = RAGService.cached_answer(key, payload.user_id, payload.top_k, mode)
+        if hit is not None:
+            return key, mode, hit[0], hit[1]
+        contexts = RAGService.retrieve_contexts(db, payload.user_id, payload.question, payload.top_k, mode)
+        return key, mode, None, contexts
+
+    # Embedding and retrieval are CPU/DB bound; keep them off the event loop
+    key, mode, cached_answer, contexts = await asyncio.to_thread(prepare)
+
+    async def stream_generator():
+        yield ndjson_line({"text": "", "contexts": contexts, "done": False})
+        if cached_answer is not None:
+            yield ndjson_line({"text": cached_answer, "done": False})
+            yield ndjson_line({"text": "", "done": True, "cached": True})
+            return
+        try:
+            answer = ""
+            async for chunk in RAGService.stream_answer(payload.question, contexts):
+                answer += chunk
+                yield ndjson_line({"text": chunk, "done": False})
+            if key is not None:
+                RAGService.store_answer(key, payload.user_id, payload.top_k, mode, answer, contexts)
+            yield ndjson_line({"text": "", "done": True, "cached": False})
+        except Exception as e:
+            yield ndjson_line({"error": str(e)})
+
+    return StreamingResponse(stream_generator(), media_type="application/x-ndjson")
+
+
+@router.get('/cache/stats')
+def cache_stats():
+    """Hit/miss counters for the embedding and answer caches and size of the vector cache"""
+    return {'embeddings': embedding_cache.stats(), 'answers': answer_cache.stats(), 'vectors': vector_cache.stats()}
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from app.db import get_db
-from app.services.user_service import UserService
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_async_db
+from app.services.user_service import AsyncUserService
 from app.schemas import (
     UserCreate,
     UserUpdate,
@@ -12,21 +13,22 @@ from app.schemas import (
 )
 from app.core.jwt_manager import JWTManager
 from app.models import UserRole
+from app.utils.http_cache import conditional, etag_for_payload
 
 router = APIRouter()
 
 
 @router.post("/register", response_model=UserDetailResponse, status_code=201)
-def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
-    user = UserService.create_user(db, user_data)
+    user = await AsyncUserService.create_user(db, user_data)
     return user
 
 
 @router.post("/login")
-def login_user(credentials: LoginRequest, db: Session = Depends(get_db)):
+async def login_user(credentials: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """Login user with email and password"""
-    user = UserService.authenticate_user(db, credentials.email, credentials.password)
+    user = await AsyncUserService.authenticate_user(db, credentials.email, credentials.password)
     
     # Create JWT tokens
     access_token = JWTManager.create_access_token({"user_id": user.id, "email": user.email})
@@ -40,64 +42,89 @@ def login_user(credentials: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.get("/users/{user_id}", response_model=UserDetailResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(user_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     """Get user by ID"""
-    user = UserService.get_user_by_id(db, user_id)
-    return user
+    user = await AsyncUserService.get_user_by_id(db, user_id)
+    # updated_at has only second resolution, so validate on a hash of the serialized user alone;
+    # sending it as Last-Modified would let If-Modified-Since miss a same-second update
+    payload = UserDetailResponse.model_validate(user).model_dump(mode="json")
+    not_modified = conditional(request, response, etag_for_payload(payload))
+    if not_modified:
+        return not_modified
+    return payload
+
+
+def set_next_cursor(response: Response, users: list, limit: int):
+    # A full page may have more after it; the client passes this back as ?cursor=
+    if len(users) == limit:
+        response.headers["X-Next-Cursor"] = str(users[-1].id)
 
 
 @router.get("/users", response_model=list[UserResponse])
-def list_users(
+async def list_users(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[int] = Query(None, ge=0, description="Last user id of the previous page; replaces skip"),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get all users with pagination"""
-    users = UserService.get_all_users(db, skip=skip, limit=limit)
+    users = await AsyncUserService.get_all_users(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, users, limit)
     return users
 
 
 @router.get("/users/role/{role}", response_model=list[UserResponse])
-def get_users_by_role(
+async def get_users_by_role(
     role: UserRole,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[int] = Query(None, ge=0, description="Last user id of the previous page; replaces skip"),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get users filtered by role"""
-    users = UserService.get_users_by_role(db, role, skip=skip, limit=limit)
+    users = await AsyncUserService.get_users_by_role(db, role, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, users, limit)
     return users
 
 
 @router.put("/users/{user_id}", response_model=UserDetailResponse)
-def update_user(user_id: int, user_data: UserUpdate, db: Session = Depends(get_db)):
+async def update_user(user_id: int, user_data: UserUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update user details"""
-    user = UserService.update_user(db, user_id, user_data)
+    user = await AsyncUserService.update_user(db, user_id, user_data)
     return user
 
 
 @router.delete("/users/{user_id}", status_code=204)
-def delete_user(user_id: int, db: Session = Depends(get_db)):
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a user"""
-    UserService.delete_user(db, user_id)
+    await AsyncUserService.delete_user(db, user_id)
     return None
 
 
 @router.post("/users/{user_id}/change-password", response_model=UserDetailResponse)
-def change_password(
+async def change_password(
     user_id: int,
     password_data: PasswordChangeRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Change user password"""
-    user = UserService.change_password(
+    user = await AsyncUserService.change_password(
         db, user_id, password_data.old_password, password_data.new_password
     )
     return user
 
 
 @router.get("/stats/total-users")
-def get_total_users(db: Session = Depends(get_db)):
+async def get_total_users(db: AsyncSession = Depends(get_async_db)):
     """Get total number of users"""
-    count = UserService.user_count(db)
+    count = await AsyncUserService.user_count(db)
     return {"total_users": count}
+
+
+@router.get("/stats/roles")
+async def get_role_counts(db: AsyncSession = Depends(get_async_db)):
+    """Get number of users per role"""
+    counts = await AsyncUserService.role_counts(db)
+    return {"roles": counts}
@@ -0,0 +1,88 @@
+import logging
+import threading
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_embedder = None
+_embedder_loaded = False
+_openai_client = None
+_async_openai_client = None
+
+
+def get_embedder():
+    """Return the shared SentenceTransformer, loading it on first use.
+
+    Returns None when sentence-transformers is not installed.
+    """
+    global _embedder, _embedder_loaded
+    if _embedder_loaded:
+        return _embedder
+    with _lock:
+        if not _embedder_loaded:
+            try:
+                from sentence_transformers import SentenceTransformer
+                _embedder = SentenceTransformer(settings.EMBEDDING_MODEL)
+            except ImportError:
+                _embedder = None
+            _embedder_loaded = True
+    return _embedder
+
+
+def get_openai_client():
+    """Return the shared sync OpenAI client, or None if no API key is configured."""
+    global _openai_client
+    if _openai_client is None and settings.OPENAI_API_KEY:
+        with _lock:
+            if _openai_client is None:
+                from openai import OpenAI
+                _openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    return _openai_client
+
+
+def get_async_openai_client():
+    """Return the process-wide AsyncOpenAI client, or None if no API key is configured.
+
+    All requests share one keep-alive connection pool instead of opening a
+    new TLS connection per call.
+    """
+    global _async_openai_client
+    if _async_openai_client is None and settings.OPENAI_API_KEY:
+        with _lock:
+            if _async_openai_client is None:
+                import httpx
+                from openai import AsyncOpenAI
+                http_client = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE,
+                    ),
+                    timeout=httpx.Timeout(settings.OPENAI_TIMEOUT_SECONDS, connect=10.0),
+                )
+                _async_openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, http_client=http_client)
+    return _async_openai_client
+
+
+async def close_async_clients():
+    """Close pooled async connections; called on application shutdown."""
+    global _async_openai_client
+    client, _async_openai_client = _async_openai_client, None
+    if client is not None:
+        await client.close()
+
+
+def warm_up() -> threading.Thread:
+    """Load the embedder and LLM client in a background thread so the first request doesn't pay for it."""
+    def _load():
+        try:
+            get_embedder()
+            get_openai_client()
+            logger.info("Model warm-up complete")
+        except Exception:
+            logger.exception("Model warm-up failed")
+
+    thread = threading.Thread(target=_load, name="warm-up", daemon=True)
+    thread.start()
+    return thread
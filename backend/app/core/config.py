@@ -10,6 +10,9 @@ class Settings:
     ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
     # Refresh token lifetime in days (default: 30 days)
     REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+    # Verified tokens kept so repeat requests skip signature checks; entries expire at the token's exp
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+    TOKEN_CACHE_MAX_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_MAX_TTL_SECONDS", "300"))
     
     # OAuth Configuration
     OAUTH_CLIENT_ID = os.getenv("OAUTH_CLIENT_ID", "")
@@ -18,8 +21,114 @@ class Settings:
     # OpenAI Configuration
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    # Model used to answer diary (RAG) questions
+    RAG_MODEL = os.getenv("RAG_MODEL", OPENAI_MODEL)
+    # Shared HTTP connection pool for the async OpenAI client
+    OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+    OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+    OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "60"))
     
+    # Load the embedding model in the background at startup instead of on the first RAG request
+    WARM_UP_MODELS = os.getenv("WARM_UP_MODELS", "true").lower() in ("1", "true", "yes")
+
+    # Chat history sent to the LLM is capped at this many tokens; older turns are summarized
+    CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "2000"))
+    # After summarizing, keep recent turns within this fraction of the budget
+    CHAT_HISTORY_KEEP_RATIO = float(os.getenv("CHAT_HISTORY_KEEP_RATIO", "0.6"))
+    CHAT_SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL", OPENAI_MODEL)
+    CHAT_SUMMARY_CACHE_SIZE = int(os.getenv("CHAT_SUMMARY_CACHE_SIZE", "1024"))
+
+    # Server-side chat sessions stay in memory for this long after last use
+    CHAT_SESSION_TTL_SECONDS = float(os.getenv("CHAT_SESSION_TTL_SECONDS", "1800"))
+    CHAT_SESSION_CACHE_SIZE = int(os.getenv("CHAT_SESSION_CACHE_SIZE", "2048"))
+
+    # Crisis detection: extra phrases (';'-separated) and/or a file with one phrase per line
+    CRISIS_PHRASES = os.getenv("CRISIS_PHRASES", "")
+    CRISIS_PHRASES_FILE = os.getenv("CRISIS_PHRASES_FILE", "")
+    # Also scan the streamed assistant response (for explicit self-harm phrases only), not just the user's message
+    CRISIS_SCAN_RESPONSE = os.getenv("CRISIS_SCAN_RESPONSE", "false").lower() in ("1", "true", "yes")
+
+    # RAG Configuration
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    # Storage precision for diary embeddings: float32 or float16 (half the size)
+    EMBEDDING_STORAGE_DTYPE = os.getenv("EMBEDDING_STORAGE_DTYPE", "float32")
+    # Upper bound on memory held by cached per-user embedding matrices (default: 64 MiB)
+    RAG_VECTOR_CACHE_MAX_BYTES = int(os.getenv("RAG_VECTOR_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    # Entries per SentenceTransformer batch and per insert transaction when indexing
+    RAG_EMBED_BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", "64"))
+    RAG_INDEX_CHUNK_SIZE = int(os.getenv("RAG_INDEX_CHUNK_SIZE", "512"))
+    # Quiet period after the last edit to an entry before it is re-embedded
+    RAG_REINDEX_DEBOUNCE_SECONDS = float(os.getenv("RAG_REINDEX_DEBOUNCE_SECONDS", "2.0"))
+    # In-memory embedding cache entries; set EMBEDDING_CACHE_PATH to also persist them in a SQLite file
+    EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
+    # Whether EMBEDDING_MODEL ignores case, so cache keys can fold it; unset: true only for known uncased models
+    EMBEDDING_CASE_INSENSITIVE = os.getenv("EMBEDDING_CASE_INSENSITIVE", "")
+    # Semantic answer cache: paraphrased questions at or above this cosine similarity reuse an answer
+    RAG_ANSWER_CACHE_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.95"))
+    RAG_ANSWER_CACHE_TTL_SECONDS = float(os.getenv("RAG_ANSWER_CACHE_TTL_SECONDS", "3600"))
+    RAG_ANSWER_CACHE_SIZE = int(os.getenv("RAG_ANSWER_CACHE_SIZE", "2048"))
+    # Vector index backend: "exact" (brute-force scan) or "ivf" (approximate, persisted per user)
+    RAG_INDEX_BACKEND = os.getenv("RAG_INDEX_BACKEND", "exact")
+    RAG_INDEX_DIR = os.getenv("RAG_INDEX_DIR", "./vector_index")
+    # Number of IVF lists scanned per query; higher is slower but closer to exact
+    RAG_IVF_NPROBE = int(os.getenv("RAG_IVF_NPROBE", "8"))
+    # Users with fewer vectors than this get a single list (exact scan)
+    RAG_IVF_MIN_TRAIN = int(os.getenv("RAG_IVF_MIN_TRAIN", "256"))
+    # Default retrieval for /rag/chat: "vector", "lexical" (BM25 over diary_fts) or "hybrid" (both, fused)
+    RAG_RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "vector")
+    # Hybrid: candidates taken from each ranking, and the reciprocal rank fusion constant
+    RAG_HYBRID_CANDIDATES = int(os.getenv("RAG_HYBRID_CANDIDATES", "50"))
+    RAG_RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+
+    # Jokes API Configuration
+    JOKES_API_URL = os.getenv("JOKES_API_URL", "https://official-joke-api.appspot.com/random_joke")
+    # Fall back to the local joke list when the API takes longer than this
+    JOKES_API_TIMEOUT_SECONDS = float(os.getenv("JOKES_API_TIMEOUT_SECONDS", "2.0"))
+    # Prefetched jokes kept in memory; refilled in the background below the low-water mark
+    JOKES_BUFFER_SIZE = int(os.getenv("JOKES_BUFFER_SIZE", "16"))
+    JOKES_BUFFER_LOW_WATER = int(os.getenv("JOKES_BUFFER_LOW_WATER", "4"))
+    JOKES_RETRY_SECONDS = float(os.getenv("JOKES_RETRY_SECONDS", "30"))
+
+    # Responses smaller than this are sent uncompressed; compression doesn't pay off below ~1 KB
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+    # Dynamic responses want a fast level; brotli's 10-11 are only worth it for static assets
+    BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+    # Rows per transaction when bulk importing diary entries
+    DIARY_IMPORT_BATCH_SIZE = int(os.getenv("DIARY_IMPORT_BATCH_SIZE", "500"))
+    # Import errors reported back per request; the rest are only counted
+    DIARY_IMPORT_MAX_ERRORS = int(os.getenv("DIARY_IMPORT_MAX_ERRORS", "20"))
+    # Rows fetched per round trip when streaming an export
+    DIARY_EXPORT_CHUNK_SIZE = int(os.getenv("DIARY_EXPORT_CHUNK_SIZE", "500"))
+
+    # bcrypt work factor for new hashes; existing hashes are upgraded on the next login
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    # Processes that hash/verify passwords; 0 runs bcrypt inline in the request thread
+    BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(os.cpu_count() or 1)))
+    # Hash jobs allowed to wait for a free worker before new ones are rejected with 503
+    BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", "32"))
+    # How long a request waits for a queue slot before it is rejected
+    BCRYPT_QUEUE_TIMEOUT_SECONDS = float(os.getenv("BCRYPT_QUEUE_TIMEOUT_SECONDS", "0.1"))
+
     # SQLite Database Configuration (no server needed)
-    DATABASE_URL = "sqlite:///./heybuddy.db"
+    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./heybuddy.db")
+    # Async driver URL for AsyncSession endpoints; derived from DATABASE_URL when unset
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", "")
+    # Log every SQL statement; development only, it dominates request time
+    DATABASE_ECHO = os.getenv("DATABASE_ECHO", "false").lower() in ("1", "true", "yes")
+    # "production" applies the SQLite pragmas below on every connection, "default" leaves SQLite's defaults
+    DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "production")
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    # Negative values are KiB: -65536 is a 64 MiB page cache per connection
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+    # How long a writer waits for the lock before failing with "database is locked"
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
 
 settings = Settings()
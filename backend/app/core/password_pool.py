@@ -0,0 +1,135 @@
+import asyncio
+import multiprocessing
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from bcrypt import checkpw, gensalt, hashpw
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+
+def _hash(password: bytes, rounds: int) -> bytes:
+    return hashpw(password, gensalt(rounds))
+
+
+def _check(password: bytes, hashed: bytes) -> bool:
+    return checkpw(password, hashed)
+
+
+class PasswordPool:
+    """Runs bcrypt in a bounded process pool with admission control.
+
+    bcrypt is deliberately slow and CPU bound; run inline it holds a
+    request thread and the GIL for the whole hash. Here at most
+    `workers + max_queue` jobs are admitted at once; a request that can't
+    get a slot within `queue_timeout` is rejected with 503 straight away
+    instead of piling up behind a login spike.
+
+    Async callers should use hash_async/check_async: they wait on an
+    asyncio.Semaphore and await the worker's future, so queued logins
+    hold no threads. The sync methods block the calling thread and have
+    their own, separate admission budget.
+    """
+
+    def __init__(self, workers: int, max_queue: int, queue_timeout: float):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.capacity = max(workers, 1) + max_queue
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        # asyncio semaphores belong to one event loop; keep one per loop
+        self._async_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that already runs server threads is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _reject(self):
+        with self._lock:
+            self.rejected += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Authentication is busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+    def _done(self, result):
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._reject()
+        try:
+            if self.workers <= 0:
+                return self._done(fn(*args))
+            return self._done(self._get_executor().submit(fn, *args).result())
+        finally:
+            self._slots.release()
+
+    def _loop_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            slots = self._async_slots.get(loop)
+            if slots is None:
+                slots = self._async_slots[loop] = asyncio.Semaphore(self.capacity)
+            return slots
+
+    async def run_async(self, fn, *args):
+        slots = self._loop_slots()
+        if slots.locked():
+            try:
+                await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+            except TimeoutError:
+                self._reject()
+        else:
+            # Free slot: acquire() returns without suspending
+            await slots.acquire()
+        try:
+            if self.workers <= 0:
+                return self._done(await asyncio.to_thread(fn, *args))
+            return self._done(await asyncio.wrap_future(self._get_executor().submit(fn, *args)))
+        finally:
+            slots.release()
+
+    def hash(self, password: str, rounds: int) -> str:
+        return self.run(_hash, password.encode("utf-8"), rounds).decode("utf-8")
+
+    def check(self, password: str, hashed: str) -> bool:
+        return self.run(_check, password.encode("utf-8"), hashed.encode("utf-8"))
+
+    async def hash_async(self, password: str, rounds: int) -> str:
+        return (await self.run_async(_hash, password.encode("utf-8"), rounds)).decode("utf-8")
+
+    async def check_async(self, password: str, hashed: str) -> bool:
+        return await self.run_async(_check, password.encode("utf-8"), hashed.encode("utf-8"))
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "completed": self.completed, "rejected": self.rejected}
+
+
+password_pool = PasswordPool(
+    settings.BCRYPT_WORKERS,
+    settings.BCRYPT_MAX_QUEUE,
+    settings.BCRYPT_QUEUE_TIMEOUT_SECONDS,
+)
@@ -1,17 +1,39 @@
 import jwt
 from fastapi import HTTPException, Header
 from app.core.config import settings
-from bcrypt import hashpw, checkpw, gensalt
+from app.core.password_pool import password_pool
+from app.core.token_cache import TokenCache
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_MAX_TTL_SECONDS)
 
 
 def hash_password(password: str) -> str:
-    """Hash a password using bcrypt"""
-    return hashpw(password.encode('utf-8'), gensalt()).decode('utf-8')
+    """Hash a password using bcrypt at the configured work factor"""
+    return password_pool.hash(password, settings.BCRYPT_ROUNDS)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password"""
-    return checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    return password_pool.check(plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password for async callers: waits for a worker without holding a thread"""
+    return await password_pool.hash_async(password, settings.BCRYPT_ROUNDS)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password for async callers"""
+    return await password_pool.check_async(plain_password, hashed_password)
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True if the hash was made with a different work factor than configured"""
+    # bcrypt hashes look like $2b$12$<salt+hash>
+    try:
+        return int(hashed_password.split('$')[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
 
 
 def validate_access_token(authorization: str = Header(None)):
@@ -19,9 +41,13 @@ def validate_access_token(authorization: str = Header(None)):
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing Authorization header")
 
+    # Keyed on the raw header: normalizing it is deterministic, so a hit skips that too
+    cached = token_cache.get(authorization)
+    if cached is not None:
+        return cached
+
     # Strip common prefixes and surrounding quotes that may appear from clients
     token = authorization.replace("Bearer ", "", 1).strip()
-    print(token)
     if (token.startswith("'") and token.endswith("'")) or (
         token.startswith('"') and token.endswith('"')
     ):
@@ -33,6 +59,7 @@ def validate_access_token(authorization: str = Header(None)):
 
     try:
         decoded = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
+        token_cache.put(authorization, decoded)
         return decoded
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
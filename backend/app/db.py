@@ -1,17 +1,87 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
 
-# Create database engine with SQLite
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=True,  # Set to False in production
-    connect_args={"check_same_thread": False}  # SQLite specific: allows multiple threads
-)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite ignores FOREIGN KEY clauses (and ON DELETE CASCADE) unless enabled per connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Per-connection SQLite tuning for the production profile"""
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers proceed while a writer commits; NORMAL sync is safe with WAL
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _engine_kwargs(url: str, profile: str, echo: bool) -> dict:
+    kwargs = {"echo": echo}
+    is_sqlite = url.startswith("sqlite")
+    if is_sqlite:
+        # SQLite specific: allows multiple threads
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if profile == "production" and ":memory:" not in url:
+        kwargs.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_pre_ping=not is_sqlite,
+        )
+    return kwargs
+
+
+def make_engine(url: str = settings.DATABASE_URL, profile: str = settings.DATABASE_PROFILE, echo: bool = settings.DATABASE_ECHO):
+    """Create an engine for url; the production profile tunes SQLite and the connection pool"""
+    new_engine = create_engine(url, **_engine_kwargs(url, profile, echo))
+    if url.startswith("sqlite"):
+        event.listen(new_engine, "connect", _enable_sqlite_foreign_keys)
+        if profile == "production":
+            event.listen(new_engine, "connect", _apply_sqlite_pragmas)
+    return new_engine
+
+
+def async_url(url: str) -> str:
+    """Map a sync SQLite URL to aiosqlite; other databases need ASYNC_DATABASE_URL"""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    return url
+
+
+def make_async_engine(url: str = settings.ASYNC_DATABASE_URL or async_url(settings.DATABASE_URL),
+                      profile: str = settings.DATABASE_PROFILE, echo: bool = settings.DATABASE_ECHO):
+    """Async counterpart of make_engine, with the same profile applied"""
+    new_engine = create_async_engine(url, **_engine_kwargs(url, profile, echo))
+    if url.startswith("sqlite"):
+        event.listen(new_engine.sync_engine, "connect", _enable_sqlite_foreign_keys)
+        if profile == "production":
+            event.listen(new_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return new_engine
+
+
+# Create database engine
+engine = make_engine()
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for endpoints that await the database instead of occupying a threadpool thread
+async_engine = make_async_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Base class for all models
 Base = declarative_base()
 
@@ -25,6 +95,25 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def create_all_tables():
-    """Create all database tables"""
+    """Create all database tables straight from the models (scripts and benchmarks on scratch databases)"""
     Base.metadata.create_all(bind=engine)
+
+
+def run_migrations(url: str = settings.DATABASE_URL):
+    """Upgrade the database to the latest Alembic revision"""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    # Keep the application's logging setup instead of alembic.ini's
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
@@ -1,24 +1,59 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes import register_routes
-from app.db import create_all_tables
+from app.db import run_migrations, async_engine
+from app.core.config import settings
+from app.core.clients import warm_up, close_async_clients
+from app.core.password_pool import password_pool
+from app.core.compression import CompressionMiddleware
+from app.utils.fast_json import FastJSONResponse
+from app.services.reindex_worker import reindex_worker
+from app.services.jokes_service import joke_prefetcher
 
-app = FastAPI(title="Full Stack Backend")
 
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins (change to specific domains in production)
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bring the database schema up to date on startup
+    run_migrations()
+    if settings.WARM_UP_MODELS:
+        # Load the embedding model in the background; requests that don't need it are served meanwhile
+        warm_up()
+    await joke_prefetcher.start()
+    yield
+    await joke_prefetcher.stop()
+    reindex_worker.stop(timeout=5)
+    password_pool.shutdown()
+    await async_engine.dispose()
+    await close_async_clients()
 
-# Create all database tables on startup
-create_all_tables()
 
-register_routes(app)
+def create_app() -> FastAPI:
+    app = FastAPI(title="Full Stack Backend", lifespan=lifespan, default_response_class=FastJSONResponse)
 
-@app.get("/health")
-def health_check():
-    return {"status": "ok"}
+    # Configure CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allow all origins (change to specific domains in production)
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        gzip_level=settings.GZIP_LEVEL,
+        brotli_quality=settings.BROTLI_QUALITY,
+    )
+
+    register_routes(app)
+
+    @app.get("/health")
+    def health_check():
+        return {"status": "ok"}
+
+    return app
+
+
+app = create_app()
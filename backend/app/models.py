@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum, Text, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum, Text, ForeignKey, Date, LargeBinary, Boolean, Index
 from sqlalchemy.sql import func
 from app.db import Base
 import enum
@@ -15,6 +15,10 @@ class UserRole(str, enum.Enum):
 class User(Base):
     """User model for storing user details"""
     __tablename__ = "users"
+    __table_args__ = (
+        # Keyset pagination of one role's users
+        Index("ix_users_role_id", "role", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False, index=True)
@@ -29,12 +33,27 @@ class User(Base):
         return f"<User(id={self.id}, email={self.email}, name={self.name}, role={self.role})>"
 
 
+class UserCounter(Base):
+    """Maintained user counts ("total" and "role:<role>"), so stats don't COUNT(*) the users table"""
+    __tablename__ = "user_counters"
+
+    name = Column(String(32), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserCounter(name={self.name}, count={self.count})>"
+
+
 class Diary(Base):
     """Diary entries for users"""
     __tablename__ = "diary_entries"
+    __table_args__ = (
+        # One entry per user per day; also serves every per-user lookup
+        Index("ix_diary_entries_user_id_date", "user_id", "date", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     date = Column(Date, nullable=False, index=True)
     content = Column(Text, nullable=False)
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
@@ -44,15 +63,60 @@ class Diary(Base):
         return f"<Diary(id={self.id}, user_id={self.user_id}, date={self.date})>"
 
 
+class DiaryVersion(Base):
+    """Per-user counter bumped on every diary or diary index change, for cache validation"""
+    __tablename__ = "diary_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<DiaryVersion(user_id={self.user_id}, version={self.version})>"
+
+
 class DiaryVector(Base):
     """Store embeddings for diary entries to support RAG queries"""
     __tablename__ = "diary_vectors"
 
     id = Column(Integer, primary_key=True, index=True)
-    diary_id = Column(Integer, ForeignKey("diary_entries.id"), nullable=False, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    embedding = Column(String, nullable=False)  # JSON array stored as text
+    diary_id = Column(Integer, ForeignKey("diary_entries.id", ondelete="CASCADE"), nullable=False, unique=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    vector = Column(LargeBinary, nullable=False)  # raw little-endian floats, see VectorCodec
+    dim = Column(Integer, nullable=False)
+    dtype = Column(String(16), nullable=False, default="float32")
+    model = Column(String(128), nullable=False)
+    content_hash = Column(String(64), nullable=True)  # sha256 of the embedded text
+    dirty = Column(Boolean, nullable=False, default=False, server_default="0")  # content changed since embedding
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
 
     def __repr__(self):
         return f"<DiaryVector(id={self.id}, diary_id={self.diary_id}, user_id={self.user_id})>"
+
+
+
+class Conversation(Base):
+    """Server-side chat session owned by a user"""
+    __tablename__ = "conversations"
+
+    id = Column(String(36), primary_key=True)  # uuid4 hex
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<Conversation(id={self.id}, user_id={self.user_id})>"
+
+
+class ConversationMessage(Base):
+    """One user or assistant turn in a conversation"""
+    __tablename__ = "conversation_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(String(36), ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False, index=True)
+    role = Column(String(16), nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<ConversationMessage(id={self.id}, conversation_id={self.conversation_id}, role={self.role})>"
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.vector_cache import normalize
+
+
+class _CachedAnswer:
+    __slots__ = ("embedding", "top_k", "mode", "answer", "contexts", "expires_at")
+
+    def __init__(self, embedding: np.ndarray, top_k: int, mode: str, answer: str, contexts: List[dict],
+                 expires_at: float):
+        self.embedding = embedding
+        self.top_k = top_k
+        self.mode = mode
+        self.answer = answer
+        self.contexts = contexts
+        self.expires_at = expires_at
+
+
+class AnswerCache:
+    """RAG answers keyed by user, diary version and question embedding.
+
+    A lookup hits when a cached question for the same user, diary version,
+    top_k and retrieval mode has cosine similarity >= threshold with the
+    new one, so paraphrases are served too. Any diary change bumps the version, which
+    drops that user's answers. Bounded by total entries (LRU by user) and TTL.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries: int, per_user: int = 64):
+        self.threshold = threshold
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.per_user = per_user
+        self._users: "OrderedDict[int, Tuple[int, list[_CachedAnswer]]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _drop_user(self, user_id: int):
+        _, entries = self._users.pop(user_id, (0, []))
+        self._size -= len(entries)
+
+    def get(self, user_id: int, version: int, question_emb: np.ndarray, top_k: int,
+            mode: str = "vector") -> Optional[Tuple[str, List[dict]]]:
+        q = normalize(np.asarray(question_emb, dtype=np.float32))
+        now = time.monotonic()
+        with self._lock:
+            cached_version, entries = self._users.get(user_id, (None, []))
+            if cached_version != version:
+                self._drop_user(user_id)
+                entries = []
+            live = [e for e in entries if e.expires_at > now]
+            if len(live) != len(entries):
+                self._size -= len(entries) - len(live)
+                self._users[user_id] = (version, live)
+            candidates = [e for e in live if e.top_k == top_k and e.mode == mode]
+            if candidates:
+                scores = np.stack([e.embedding for e in candidates]) @ q
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._users.move_to_end(user_id)
+                    self.hits += 1
+                    return candidates[best].answer, candidates[best].contexts
+            self.misses += 1
+            return None
+
+    def put(self, user_id: int, version: int, question_emb: np.ndarray, top_k: int, answer: str, contexts: List[dict],
+            mode: str = "vector"):
+        q = normalize(np.asarray(question_emb, dtype=np.float32))
+        entry = _CachedAnswer(q, top_k, mode, answer, contexts, time.monotonic() + self.ttl)
+        with self._lock:
+            cached_version, entries = self._users.get(user_id, (None, []))
+            if cached_version != version:
+                self._drop_user(user_id)
+                entries = []
+            entries.append(entry)
+            self._size += 1
+            if len(entries) > self.per_user:
+                entries.pop(0)
+                self._size -= 1
+            self._users[user_id] = (version, entries)
+            self._users.move_to_end(user_id)
+            while self._size > self.max_entries and self._users:
+                oldest = next(iter(self._users))
+                self._drop_user(oldest)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._users),
+                "entries": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+answer_cache = AnswerCache(
+    settings.RAG_ANSWER_CACHE_THRESHOLD,
+    settings.RAG_ANSWER_CACHE_TTL_SECONDS,
+    settings.RAG_ANSWER_CACHE_SIZE,
+)
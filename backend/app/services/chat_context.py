@@ -0,0 +1,241 @@
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import settings
+from app.core.clients import get_async_openai_client
+
+logger = logging.getLogger(__name__)
+
+# Use the model's real tokenizer when tiktoken is installed, otherwise estimate
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+# Per-message framing overhead in the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a supportive conversation between a user and HeyBuddy, "
+    "an AI mental health companion. Merge the new turns into the existing summary. Keep facts the "
+    "user shared about themselves, their feelings, events and anything HeyBuddy promised or suggested. "
+    "Write in third person, at most 150 words."
+)
+
+
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message: dict) -> int:
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _turns_hash(turns: list[dict]) -> str:
+    h = hashlib.sha256()
+    for t in turns:
+        h.update(t["role"].encode("utf-8"))
+        h.update(b"\0")
+        h.update(t["content"].encode("utf-8"))
+        h.update(b"\1")
+    return h.hexdigest()
+
+
+@dataclass
+class RollingSummary:
+    covered: int  # number of leading history turns folded into text
+    prefix_hash: str  # hash of those turns, to detect edited or foreign history
+    text: str
+
+
+@dataclass
+class ContextStats:
+    full_tokens: int
+    sent_tokens: int
+    summarized_turns: int
+    summary_scheduled: bool  # a background summary refresh was started for this request
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(self.full_tokens - self.sent_tokens, 0)
+
+
+class ContextMetrics:
+    """Process-wide counters of prompt tokens saved by history windowing."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.full_tokens = 0
+        self.sent_tokens = 0
+        self.summary_updates = 0
+        self.summary_failures = 0
+
+    def record(self, stats: ContextStats):
+        with self._lock:
+            self.requests += 1
+            self.full_tokens += stats.full_tokens
+            self.sent_tokens += stats.sent_tokens
+
+    def record_summary(self, ok: bool):
+        with self._lock:
+            if ok:
+                self.summary_updates += 1
+            else:
+                self.summary_failures += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            saved = max(self.full_tokens - self.sent_tokens, 0)
+            return {
+                "requests": self.requests,
+                "prompt_tokens_full": self.full_tokens,
+                "prompt_tokens_sent": self.sent_tokens,
+                "prompt_tokens_saved": saved,
+                "avg_saved_per_request": round(saved / self.requests, 1) if self.requests else 0.0,
+                "summary_updates": self.summary_updates,
+                "summary_failures": self.summary_failures,
+            }
+
+
+class ContextBuilder:
+    """Fit chat history into a token budget, folding older turns into a cached rolling summary.
+
+    While the turns after the cached summary fit in the budget they are sent
+    as-is. Once they overflow, the oldest of them are merged into the summary
+    until the recent window is back under `keep_ratio` of the budget, so the
+    summary is extended in blocks every few turns rather than on every message.
+
+    The summary LLM call runs in the background so it never delays the
+    reply: the request that overflows is sent with the cached summary and
+    the trimmed recent window, and later requests pick up the new summary.
+    """
+
+    def __init__(self, budget: int, keep_ratio: float, cache_size: int, metrics: ContextMetrics):
+        self.budget = budget
+        self.keep_ratio = keep_ratio
+        self.cache_size = cache_size
+        self.metrics = metrics
+        self._summaries: "OrderedDict[str, RollingSummary]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    def _cached(self, key: str, turns: list[dict]) -> Optional[RollingSummary]:
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is not None:
+                self._summaries.move_to_end(key)
+        if summary is None or summary.covered > len(turns):
+            return None
+        if _turns_hash(turns[:summary.covered]) != summary.prefix_hash:
+            return None
+        return summary
+
+    def _store(self, key: str, summary: RollingSummary):
+        with self._lock:
+            self._summaries[key] = summary
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.cache_size:
+                self._summaries.popitem(last=False)
+
+    async def _summarize(self, previous: Optional[str], turns: list[dict]) -> str:
+        client = get_async_openai_client()
+        transcript = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+        resp = await client.chat.completions.create(
+            model=settings.CHAT_SUMMARY_MODEL,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Existing summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"},
+            ],
+            max_tokens=256,
+            temperature=0.2,
+        )
+        return resp.choices[0].message.content.strip()
+
+    async def _refresh(self, key: str, previous: Optional[str], turns: list[dict], start: int):
+        try:
+            text = await self._summarize(previous, turns[start:])
+            self._store(key, RollingSummary(len(turns), _turns_hash(turns), text))
+            self.metrics.record_summary(True)
+        except Exception:
+            # The stale summary stays in use; the next overflowing request retries
+            logger.exception("Conversation summary failed for %s", key)
+            self.metrics.record_summary(False)
+        finally:
+            self._refreshing.pop(key, None)
+
+    def _schedule_refresh(self, key: str, previous: Optional[str], turns: list[dict], start: int) -> bool:
+        if key in self._refreshing:
+            return False
+        self._refreshing[key] = asyncio.create_task(self._refresh(key, previous, turns, start))
+        return True
+
+    async def wait_for_refreshes(self):
+        """Wait for in-flight summary refreshes."""
+        if self._refreshing:
+            await asyncio.gather(*self._refreshing.values(), return_exceptions=True)
+
+    async def build(self, system_prompt: str, message: str, history: list[dict], key: str) -> tuple[list[dict], ContextStats]:
+        system = {"role": "system", "content": system_prompt}
+        current = {"role": "user", "content": message}
+        turns = [{"role": h.get("role", "user"), "content": h.get("content", "")} for h in history]
+        costs = [message_tokens(t) for t in turns]
+        fixed = message_tokens(system) + message_tokens(current)
+        full_tokens = fixed + sum(costs)
+
+        cached = self._cached(key, turns)
+        start = cached.covered if cached else 0
+        summary_text = cached.text if cached else None
+        covered = start
+        scheduled = False
+
+        if sum(costs[start:]) > self.budget:
+            # Keep the newest turns within keep_ratio of the budget; fold the rest in
+            target = int(self.budget * self.keep_ratio)
+            cut, used = len(turns), 0
+            while cut > start and used + costs[cut - 1] <= target:
+                used += costs[cut - 1]
+                cut -= 1
+            if cut > start:
+                scheduled = self._schedule_refresh(key, summary_text, turns[:cut], start)
+                # Until the refresh lands, turns between the summary and the window are left out
+                start = cut
+
+        messages = [system]
+        if summary_text and covered:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation: {summary_text}"})
+        messages += turns[start:]
+        messages.append(current)
+
+        stats = ContextStats(
+            full_tokens=full_tokens,
+            sent_tokens=sum(message_tokens(m) for m in messages),
+            summarized_turns=start,
+            summary_scheduled=scheduled,
+        )
+        return messages, stats
+
+
+def conversation_key(user_id, conversation_id: Optional[str], history: list[dict]) -> str:
+    """Cache key for a conversation: the client's id if given, else its first turn."""
+    if conversation_id:
+        return f"{user_id}:{conversation_id}"
+    first = history[0].get("content", "") if history else ""
+    return f"{user_id}:first:{hashlib.sha256(first.encode('utf-8')).hexdigest()}"
+
+
+context_metrics = ContextMetrics()
+context_builder = ContextBuilder(
+    settings.CHAT_HISTORY_TOKEN_BUDGET,
+    settings.CHAT_HISTORY_KEEP_RATIO,
+    settings.CHAT_SUMMARY_CACHE_SIZE,
+    context_metrics,
+)
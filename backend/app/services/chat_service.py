@@ -1,13 +1,11 @@
 from app.core.config import settings
-import asyncio
+from app.core.clients import get_async_openai_client
+from app.utils.phrase_matcher import PhraseMatcher
+from app.services.chat_context import context_builder, context_metrics, conversation_key
+from typing import Optional
+import logging
 
-try:
-    from openai import OpenAI, AsyncOpenAI
-except Exception as e:
-    raise ImportError(
-        "The openai client is required for ChatService but could not be imported: "
-        f"{e}. Install `openai` in the running environment."
-    )
+logger = logging.getLogger(__name__)
 
 SYSTEM_PROMPT = (
     "You are HeyBuddy, a supportive AI mental health companion. "
@@ -20,60 +18,92 @@ SYSTEM_PROMPT = (
 )
 
 
-def _build_messages(message: str, history: list[dict]) -> list[dict]:
-    """Build OpenAI-compatible messages list from history and current message."""
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-    for h in history:
-        messages.append({"role": h.get("role", "user"), "content": h.get("content", "")})
-    messages.append({"role": "user", "content": message})
-    return messages
+DEFAULT_CRISIS_PHRASES = [
+    "suicide",
+    "kill myself",
+    "end my life",
+    "can't go on",
+    "hopeless",
+    "crisis",
+    "urgent help",
+]
+
+# Assistant replies routinely say "crisis" or "urgent help" when being supportive, so
+# responses are only checked for explicit self-harm phrases
+RESPONSE_CRISIS_PHRASES = [
+    "suicide",
+    "kill myself",
+    "end my life",
+]
+
+ALERT_MARKER = "|ALERT|true|"
+
+
+def _load_crisis_phrases() -> list[str]:
+    """Default crisis phrases plus any from CRISIS_PHRASES (';'-separated) or CRISIS_PHRASES_FILE (one per line)."""
+    phrases = list(DEFAULT_CRISIS_PHRASES)
+    phrases += [p for p in settings.CRISIS_PHRASES.split(";") if p.strip()]
+    if settings.CRISIS_PHRASES_FILE:
+        with open(settings.CRISIS_PHRASES_FILE, encoding="utf-8") as f:
+            phrases += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return phrases
+
+
+# Compiled once per process; scanning is linear in text length whatever the phrase count
+crisis_matcher = PhraseMatcher(_load_crisis_phrases())
+response_crisis_matcher = PhraseMatcher(RESPONSE_CRISIS_PHRASES)
 
 
 class ChatService:
     @staticmethod
-    async def chat(message: str, history: list[dict]):
-        """Stream OpenAI API responses and yield text chunks."""
+    async def chat(message: str, history: list[dict], conversation: Optional[str] = None):
+        """Stream OpenAI API responses and yield text chunks.
+
+        `conversation` keys the cached rolling summary of older history turns.
+        """
         if not settings.OPENAI_API_KEY:
             raise RuntimeError("OPENAI_API_KEY is not set; cannot call OpenAI API")
 
-        alert_keywords = [
-            "suicide",
-            "kill myself",
-            "end my life",
-            "can't go on",
-            "hopeless",
-            "crisis",
-            "urgent help",
-        ]
-
-        user_text = message.lower()
-        messages = _build_messages(message, history)
+        # Check the user's message before calling the LLM so an alert goes out immediately
+        alert = bool(crisis_matcher.search(message))
+        if alert:
+            yield ALERT_MARKER
+
+        # Recent turns within the token budget, older ones folded into a rolling summary
+        messages, stats = await context_builder.build(
+            SYSTEM_PROMPT, message, history, conversation or conversation_key(None, None, history)
+        )
+        context_metrics.record(stats)
+        logger.info(
+            "Chat prompt: %d tokens sent of %d (%d saved, %d turns summarized)",
+            stats.sent_tokens, stats.full_tokens, stats.saved_tokens, stats.summarized_turns,
+        )
         model = getattr(settings, "OPENAI_MODEL", "gpt-3.5-turbo")
 
-        def _call_sync_stream():
-            """Call OpenAI with streaming enabled."""
-            client = OpenAI(api_key=settings.OPENAI_API_KEY)
-            stream = client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=0.7,
-                stream=True
-            )
-            return stream
-
-        # Run the streaming call in a thread
-        stream = await asyncio.to_thread(_call_sync_stream)
-
-        # Yield chunks from the stream
-        full_response = ""
-        for chunk in stream:
-            if chunk.choices and chunk.choices[0].delta.content:
-                content = chunk.choices[0].delta.content
-                full_response += content
-                yield content
-
-        # Detect alert based on full response or user message
-        alert = any(word in user_text for word in alert_keywords)
-        # Yield final alert status as JSON
-        yield f'|ALERT|{str(alert).lower()}|'
+        # Shared AsyncOpenAI client: pooled keep-alive connections, no thread per request
+        client = get_async_openai_client()
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.7,
+            stream=True
+        )
 
+        # Yield chunks as they arrive without blocking the event loop
+        response_scan = response_crisis_matcher.scanner()
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    content = chunk.choices[0].delta.content
+                    yield content
+                    # Scan the response incrementally; phrases split across chunks still match
+                    if not alert and settings.CRISIS_SCAN_RESPONSE and response_scan.feed(content):
+                        alert = True
+                        yield ALERT_MARKER
+        finally:
+            # On client disconnect the generator is cancelled; release the upstream
+            # connection so OpenAI stops generating tokens nobody will read
+            await stream.close()
+
+        # Yield final alert status
+        yield f'|ALERT|{str(alert).lower()}|'
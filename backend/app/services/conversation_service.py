@@ -0,0 +1,147 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.db import SessionLocal
+from app.models import Conversation, ConversationMessage
+
+
+class _CachedConversation:
+    __slots__ = ("user_id", "messages", "expires_at")
+
+    def __init__(self, user_id: int, messages: list[dict], expires_at: float):
+        self.user_id = user_id
+        self.messages = messages
+        self.expires_at = expires_at
+
+
+class ConversationCache:
+    """Hot in-memory copy of recently active conversations, evicted after a TTL of inactivity."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _CachedConversation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict_expired(self, now: float):
+        # Entries are kept in last-access order, so expired ones sit at the front
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if oldest.expires_at > now:
+                break
+            self._entries.popitem(last=False)
+
+    def get(self, conversation_id: str) -> Optional[_CachedConversation]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.get(conversation_id)
+            if entry is not None:
+                entry.expires_at = now + self.ttl
+                self._entries.move_to_end(conversation_id)
+            return entry
+
+    def put(self, conversation_id: str, user_id: int, messages: list[dict]):
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            self._entries[conversation_id] = _CachedConversation(user_id, messages, now + self.ttl)
+            self._entries.move_to_end(conversation_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, conversation_id: str):
+        with self._lock:
+            self._entries.pop(conversation_id, None)
+
+
+conversation_cache = ConversationCache(settings.CHAT_SESSION_TTL_SECONDS, settings.CHAT_SESSION_CACHE_SIZE)
+
+
+class ConversationService:
+    """Server-side chat sessions, so clients send only the new message each turn.
+
+    Methods open their own session because they are called from the async
+    chat endpoint via a worker thread, outside request dependencies.
+    """
+
+    @staticmethod
+    def create(user_id: Optional[int]) -> str:
+        """Start a conversation; 401 if the token carries no user, 404 if the user no longer exists."""
+        if user_id is None:
+            raise HTTPException(status_code=401, detail="Token has no user_id")
+        conversation_id = uuid.uuid4().hex
+        db = SessionLocal()
+        try:
+            db.add(Conversation(id=conversation_id, user_id=user_id))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=404, detail="User not found")
+        finally:
+            db.close()
+        conversation_cache.put(conversation_id, user_id, [])
+        return conversation_id
+
+    @staticmethod
+    def get_history(conversation_id: str, user_id: int) -> list[dict]:
+        """Return the conversation's messages; 404 if it doesn't exist or belongs to someone else."""
+        entry = conversation_cache.get(conversation_id)
+        if entry is not None:
+            owner, messages = entry.user_id, entry.messages
+        else:
+            db = SessionLocal()
+            try:
+                conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+                if conversation is None:
+                    raise HTTPException(status_code=404, detail="Conversation not found")
+                rows = (
+                    db.query(ConversationMessage.role, ConversationMessage.content)
+                    .filter(ConversationMessage.conversation_id == conversation_id)
+                    .order_by(ConversationMessage.id)
+                    .all()
+                )
+                owner = conversation.user_id
+            finally:
+                db.close()
+            messages = [{"role": role, "content": content} for role, content in rows]
+            # Not read back from the cache: it may already have evicted this entry
+            conversation_cache.put(conversation_id, owner, messages)
+        if owner != user_id:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        return list(messages)
+
+    @staticmethod
+    def append_exchange(conversation_id: str, user_id: int, user_message: str, assistant_message: str):
+        """Persist one completed user/assistant exchange and extend the cached copy.
+
+        404 if the conversation was deleted meanwhile (e.g. with its user).
+        """
+        turns = [{"role": "user", "content": user_message}, {"role": "assistant", "content": assistant_message}]
+        db = SessionLocal()
+        try:
+            db.add_all([
+                ConversationMessage(conversation_id=conversation_id, role=t["role"], content=t["content"])
+                for t in turns
+            ])
+            db.query(Conversation).filter(Conversation.id == conversation_id).update(
+                {Conversation.updated_at: func.now()}
+            )
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            conversation_cache.discard(conversation_id)
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        finally:
+            db.close()
+        entry = conversation_cache.get(conversation_id)
+        if entry is not None and entry.user_id == user_id:
+            entry.messages.extend(turns)
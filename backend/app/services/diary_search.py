@@ -0,0 +1,70 @@
+import logging
+import re
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Words that match nearly every entry and only add noise to a BM25 OR-query
+STOPWORDS = frozenset("""
+a about after all am an and any are as at be been before but by can could did do does for from had has have
+he her him his how i if in into is it its me my no not of on or our she so than that the their them then there
+they this to too up was we were what when where which who why will with would you your
+""".split())
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+BM25_QUERY = text("""
+    SELECT diary_fts.rowid, bm25(diary_fts) AS rank
+    FROM diary_fts JOIN diary_entries ON diary_entries.id = diary_fts.rowid
+    WHERE diary_fts MATCH :query AND diary_entries.user_id = :user_id
+    ORDER BY rank
+    LIMIT :limit
+""")
+
+# Per database URL: whether the diary_fts table exists (migration 0004 skips it without FTS5)
+_available: dict[str, bool] = {}
+
+
+class DiarySearch:
+    """BM25 keyword search over diary entries, backed by the diary_fts FTS5 table."""
+
+    @staticmethod
+    def fts_query(question: str) -> str:
+        """FTS5 MATCH expression for a free-text question: its distinct keywords, OR-ed.
+
+        Every term is quoted so punctuation and FTS5 operators in the
+        question (AND, NEAR, *, :) are treated as plain words.
+        """
+        terms = []
+        for word in _WORD.findall(question.lower()):
+            if word in STOPWORDS or word in terms:
+                continue
+            terms.append(word)
+        return " OR ".join(f'"{term}"' for term in terms)
+
+    @staticmethod
+    def available(db: Session) -> bool:
+        url = str(db.get_bind().url)
+        if url not in _available:
+            found = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'diary_fts'")
+            ).first() if db.get_bind().dialect.name == "sqlite" else None
+            _available[url] = found is not None
+            if not _available[url]:
+                logger.warning("diary_fts is missing; keyword retrieval is disabled")
+        return _available[url]
+
+    @staticmethod
+    def bm25(db: Session, user_id: int, question: str, limit: int) -> List[Tuple[int, float]]:
+        """Up to `limit` (diary_id, score) pairs for the user's entries matching the question, best first.
+
+        Scores are negated BM25 ranks, so higher is better like cosine scores.
+        """
+        query = DiarySearch.fts_query(question)
+        if not query or limit <= 0:
+            return []
+        rows = db.execute(BM25_QUERY, {"query": query, "user_id": user_id, "limit": limit})
+        return [(diary_id, -rank) for diary_id, rank in rows]
@@ -1,29 +1,84 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import distinct
-from app.models import Diary
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import String, cast, delete, distinct, func, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from app.models import Diary, DiaryVector, DiaryVersion
+from app.services.reindex_worker import reindex_worker
 from app.schemas import DiaryCreate, DiaryUpdate
+from sqlalchemy.dialects import postgresql, sqlite
 from fastapi import HTTPException
 from datetime import date
+from typing import AsyncIterator, Optional
+import base64
+import time
+from app.core.config import settings
+from app.utils.record_stream import Record, RecordError
+
+
+def diary_integrity_error(e: IntegrityError) -> HTTPException:
+    """Map a failed diary insert to the constraint it hit"""
+    if "foreign key" in str(e.orig).lower():
+        return HTTPException(status_code=404, detail="User not found")
+    return HTTPException(status_code=400, detail="Diary entry for this date already exists")
+
+
+# Columns a range read may project; id and date always come back for the cursor
+RANGE_FIELDS = ("id", "date", "content", "created_at", "updated_at")
+
+
+def encode_cursor(entry_date: date, entry_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{entry_date.isoformat()}|{entry_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        day, entry_id = raw.split("|")
+        return date.fromisoformat(day), int(entry_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 class DiaryService:
     """Service for diary entry operations"""
 
     @staticmethod
-    def create_entry(db: Session, diary_data: DiaryCreate) -> Diary:
-        # check if entry exists for user and date
-        existing = (
-            db.query(Diary)
-            .filter(Diary.user_id == diary_data.user_id, Diary.date == diary_data.date)
-            .first()
+    def bump_version(db: Session, user_id: int):
+        """Increment the user's diary version inside the caller's transaction."""
+        updated = (
+            db.query(DiaryVersion)
+            .filter(DiaryVersion.user_id == user_id)
+            .update({DiaryVersion.version: DiaryVersion.version + 1}, synchronize_session=False)
         )
-        if existing:
-            raise HTTPException(status_code=400, detail="Diary entry for this date already exists")
+        if not updated:
+            try:
+                with db.begin_nested():
+                    db.add(DiaryVersion(user_id=user_id, version=1))
+            except IntegrityError:
+                # another writer created the row first
+                db.query(DiaryVersion).filter(DiaryVersion.user_id == user_id).update(
+                    {DiaryVersion.version: DiaryVersion.version + 1}, synchronize_session=False
+                )
+
+    @staticmethod
+    def get_version(db: Session, user_id: int) -> int:
+        version = db.query(DiaryVersion.version).filter(DiaryVersion.user_id == user_id).scalar()
+        return version or 0
 
+    @staticmethod
+    def create_entry(db: Session, diary_data: DiaryCreate) -> Diary:
         entry = Diary(user_id=diary_data.user_id, date=diary_data.date, content=diary_data.content)
         db.add(entry)
+        try:
+            # the unique (user_id, date) index rejects a second entry for the day
+            db.flush()
+        except IntegrityError as e:
+            db.rollback()
+            raise diary_integrity_error(e)
+        DiaryService.bump_version(db, entry.user_id)
         db.commit()
         db.refresh(entry)
+        reindex_worker.mark_dirty(entry.user_id, entry.id)
         return entry
 
     @staticmethod
@@ -36,11 +91,33 @@ class DiaryService:
         for field, value in update_data.items():
             setattr(entry, field, value)
 
+        content_changed = "content" in update_data
+        if content_changed:
+            # flag the stale embedding in the same transaction as the edit
+            db.query(DiaryVector).filter(DiaryVector.diary_id == entry.id).update({DiaryVector.dirty: True})
+
         db.add(entry)
+        DiaryService.bump_version(db, entry.user_id)
         db.commit()
         db.refresh(entry)
+        if content_changed:
+            reindex_worker.mark_dirty(entry.user_id, entry.id)
         return entry
 
+    @staticmethod
+    def delete_entry(db: Session, entry_id: int) -> bool:
+        entry = db.query(Diary).filter(Diary.id == entry_id).first()
+        if not entry:
+            raise HTTPException(status_code=404, detail="Diary entry not found")
+
+        user_id = entry.user_id
+        # the entry's vector goes with it via ON DELETE CASCADE
+        db.delete(entry)
+        DiaryService.bump_version(db, user_id)
+        db.commit()
+        reindex_worker.mark_dirty(user_id, entry_id)
+        return True
+
     @staticmethod
     def get_entry_by_user_and_date(db: Session, user_id: int, entry_date: date) -> Diary:
         entry = (
@@ -61,4 +138,236 @@ class DiaryService:
             .all()
         )
         # rows are tuples like (date,)
-        return [r[0] for r in rows]
\ No newline at end of file
+        return [r[0] for r in rows]
+
+
+class AsyncDiaryService:
+    """DiaryService over an AsyncSession, for async endpoints"""
+
+    @staticmethod
+    async def bump_version(db: AsyncSession, user_id: int):
+        """Increment the user's diary version inside the caller's transaction."""
+        bump = (
+            update(DiaryVersion)
+            .where(DiaryVersion.user_id == user_id)
+            .values(version=DiaryVersion.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(bump)
+        if not result.rowcount:
+            try:
+                async with db.begin_nested():
+                    db.add(DiaryVersion(user_id=user_id, version=1))
+            except IntegrityError:
+                # another writer created the row first
+                await db.execute(bump)
+
+    @staticmethod
+    async def get_version(db: AsyncSession, user_id: int) -> int:
+        version = await db.scalar(select(DiaryVersion.version).where(DiaryVersion.user_id == user_id))
+        return version or 0
+
+    @staticmethod
+    async def _get_entry(db: AsyncSession, entry_id: int) -> Diary:
+        entry = await db.get(Diary, entry_id)
+        if not entry:
+            raise HTTPException(status_code=404, detail="Diary entry not found")
+        return entry
+
+    @staticmethod
+    async def create_entry(db: AsyncSession, diary_data: DiaryCreate) -> Diary:
+        entry = Diary(user_id=diary_data.user_id, date=diary_data.date, content=diary_data.content)
+        db.add(entry)
+        try:
+            # the unique (user_id, date) index rejects a second entry for the day
+            await db.flush()
+        except IntegrityError as e:
+            await db.rollback()
+            raise diary_integrity_error(e)
+        await AsyncDiaryService.bump_version(db, entry.user_id)
+        await db.commit()
+        await db.refresh(entry)
+        reindex_worker.mark_dirty(entry.user_id, entry.id)
+        return entry
+
+    @staticmethod
+    async def update_entry(db: AsyncSession, entry_id: int, diary_update: DiaryUpdate) -> Diary:
+        entry = await AsyncDiaryService._get_entry(db, entry_id)
+
+        update_data = diary_update.model_dump(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(entry, field, value)
+
+        content_changed = "content" in update_data
+        if content_changed:
+            # flag the stale embedding in the same transaction as the edit
+            await db.execute(update(DiaryVector).where(DiaryVector.diary_id == entry.id).values(dirty=True))
+
+        await AsyncDiaryService.bump_version(db, entry.user_id)
+        await db.commit()
+        await db.refresh(entry)
+        if content_changed:
+            reindex_worker.mark_dirty(entry.user_id, entry.id)
+        return entry
+
+    @staticmethod
+    async def delete_entry(db: AsyncSession, entry_id: int) -> bool:
+        entry = await AsyncDiaryService._get_entry(db, entry_id)
+
+        user_id = entry.user_id
+        # the entry's vector goes with it via ON DELETE CASCADE
+        await db.execute(delete(Diary).where(Diary.id == entry_id))
+        await AsyncDiaryService.bump_version(db, user_id)
+        await db.commit()
+        reindex_worker.mark_dirty(user_id, entry_id)
+        return True
+
+    @staticmethod
+    async def get_entry_by_user_and_date(db: AsyncSession, user_id: int, entry_date: date) -> Diary:
+        entry = await db.scalar(select(Diary).where(Diary.user_id == user_id, Diary.date == entry_date))
+        if not entry:
+            raise HTTPException(status_code=404, detail="Diary entry not found for the specified date")
+        return entry
+
+    @staticmethod
+    async def get_dates_for_user(db: AsyncSession, user_id: int) -> list[date]:
+        result = await db.scalars(
+            select(Diary.date).distinct().where(Diary.user_id == user_id).order_by(Diary.date.desc())
+        )
+        return list(result)
+
+    @staticmethod
+    async def get_range(
+        db: AsyncSession,
+        user_id: int,
+        start: Optional[date],
+        end: Optional[date],
+        cursor: Optional[str],
+        limit: int,
+        fields: tuple[str, ...] = RANGE_FIELDS,
+        truncate: Optional[int] = None,
+    ) -> dict:
+        """One page of entries in (date, id) order, read with a single index range scan.
+
+        `cursor` is the opaque next_cursor of the previous page (keyset
+        pagination, so deep pages cost the same as the first). `truncate`
+        cuts content to that many characters in SQL.
+        """
+        columns = {"id": Diary.id, "date": Diary.date}
+        for field in fields:
+            if field == "content" and truncate is not None:
+                columns["content"] = func.substr(Diary.content, 1, truncate).label("content")
+            elif field not in columns:
+                columns[field] = getattr(Diary, field)
+
+        stmt = select(*columns.values()).where(Diary.user_id == user_id)
+        if start is not None:
+            stmt = stmt.where(Diary.date >= start)
+        if end is not None:
+            stmt = stmt.where(Diary.date <= end)
+        if cursor:
+            stmt = stmt.where(tuple_(Diary.date, Diary.id) > tuple_(*decode_cursor(cursor)))
+        # fetch one extra row to learn whether another page exists
+        rows = (await db.execute(stmt.order_by(Diary.date, Diary.id).limit(limit + 1))).mappings().all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["date"], rows[-1]["id"])
+        return {"entries": [dict(row) for row in rows], "next_cursor": next_cursor}
+
+    @staticmethod
+    async def get_calendar(db: AsyncSession, user_id: int, year: Optional[int] = None) -> list[dict]:
+        """Per-month entry counts and first/last dates, answered from the (user_id, date) index"""
+        month = func.substr(cast(Diary.date, String), 1, 7)
+        stmt = (
+            select(month.label("month"), func.count().label("entries"),
+                   func.min(Diary.date).label("first"), func.max(Diary.date).label("last"))
+            .where(Diary.user_id == user_id)
+            .group_by(month)
+            .order_by(month)
+        )
+        if year is not None:
+            stmt = stmt.where(Diary.date >= date(year, 1, 1), Diary.date <= date(year, 12, 31))
+        return [dict(row) for row in (await db.execute(stmt)).mappings()]
+
+    @staticmethod
+    async def upsert_entries(db: AsyncSession, user_id: int, rows: dict[date, str]) -> list[int]:
+        """Insert or overwrite one batch of entries keyed by date, in one transaction.
+
+        Returns the ids of entries whose content was created or changed;
+        rows identical to what is stored are left untouched.
+        """
+        if not rows:
+            return []
+        insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+        stmt = insert(Diary).values([
+            {"user_id": user_id, "date": day, "content": content} for day, content in rows.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Diary.user_id, Diary.date],
+            set_={"content": stmt.excluded.content, "updated_at": func.now()},
+            where=Diary.content != stmt.excluded.content,
+        ).returning(Diary.id)
+        changed = list(await db.scalars(stmt))
+        if changed:
+            # overwritten entries keep their vector row until the reindex compares hashes
+            await db.execute(update(DiaryVector).where(DiaryVector.diary_id.in_(changed)).values(dirty=True))
+            await AsyncDiaryService.bump_version(db, user_id)
+        await db.commit()
+        reindex_worker.mark_dirty_many(user_id, changed)
+        return changed
+
+    @staticmethod
+    async def import_entries(db: AsyncSession, user_id: int, records: AsyncIterator[Record]) -> dict:
+        """Upsert parsed import records in batches of DIARY_IMPORT_BATCH_SIZE.
+
+        Records need a `date` (YYYY-MM-DD) and non-empty `content`; bad ones
+        are skipped and reported. A later record for the same date wins.
+        """
+        start = time.perf_counter()
+        rows, changed, errors, error_count = 0, 0, [], 0
+        batch: dict[date, str] = {}
+        async for line, record in records:
+            try:
+                if isinstance(record, RecordError):
+                    raise record
+                try:
+                    day = date.fromisoformat(str(record.get("date", "")).strip())
+                except ValueError:
+                    raise RecordError(line, "date must be YYYY-MM-DD")
+                content = record.get("content")
+                if not isinstance(content, str) or not content.strip():
+                    raise RecordError(line, "content is required")
+            except RecordError as e:
+                error_count += 1
+                if len(errors) < settings.DIARY_IMPORT_MAX_ERRORS:
+                    errors.append(str(e))
+                continue
+            rows += 1
+            batch[day] = content
+            if len(batch) >= settings.DIARY_IMPORT_BATCH_SIZE:
+                changed += len(await AsyncDiaryService.upsert_entries(db, user_id, batch))
+                batch = {}
+        changed += len(await AsyncDiaryService.upsert_entries(db, user_id, batch))
+
+        elapsed = time.perf_counter() - start
+        return {
+            "rows": rows,
+            "changed": changed,
+            "unchanged": rows - changed,
+            "failed": error_count,
+            "errors": errors,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(rows / elapsed, 1) if elapsed > 0 else None,
+        }
+
+    @staticmethod
+    async def stream_entries(db: AsyncSession, user_id: int, chunk_size: int) -> AsyncIterator[Diary]:
+        """Yield a user's entries in date order through a server-side cursor"""
+        result = await db.stream_scalars(
+            select(Diary).where(Diary.user_id == user_id).order_by(Diary.date)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for entry in result:
+            yield entry
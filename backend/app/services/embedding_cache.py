@@ -0,0 +1,144 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.utils.vector_codec import VectorCodec
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Models whose tokenizer lowercases its input, so texts differing only in case embed identically
+UNCASED_MODELS = frozenset({
+    "all-MiniLM-L6-v2",
+    "all-MiniLM-L12-v2",
+    "paraphrase-MiniLM-L6-v2",
+    "multi-qa-MiniLM-L6-cos-v1",
+})
+
+
+def model_is_uncased(model: str) -> bool:
+    """EMBEDDING_CASE_INSENSITIVE if set, else whether model is a known uncased model"""
+    if settings.EMBEDDING_CASE_INSENSITIVE:
+        return settings.EMBEDDING_CASE_INSENSITIVE.lower() in ("1", "true", "yes")
+    return model.removeprefix("sentence-transformers/") in UNCASED_MODELS
+
+
+def normalize_text(text: str, casefold: bool = True) -> str:
+    """Canonical form used for cache keys.
+
+    Case is only folded for uncased models, where "How was my week?" and
+    "how was my week? " embed identically anyway.
+    """
+    text = _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+    return text.casefold() if casefold else text
+
+
+def cache_key(model: str, text: str, casefold: bool = True) -> str:
+    # Case-preserving keys are marked so they never collide with folded ones
+    prefix = model if casefold else f"{model}\0cased"
+    return hashlib.sha256(f"{prefix}\0{normalize_text(text, casefold)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: a bounded in-memory LRU in front of an optional SQLite file.
+
+    Keys combine the model name with a hash of the normalized text, so a
+    model change never serves stale vectors. Text is casefolded only when
+    the model is uncased.
+    """
+
+    def __init__(self, model: str, max_entries: int, path: Optional[str] = None, casefold: Optional[bool] = None):
+        self.model = model
+        self.casefold = model_is_uncased(model) if casefold is None else casefold
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        if path:
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_cache ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL)"
+            )
+            self._disk.commit()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, emb: np.ndarray):
+        self._memory[key] = emb
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: list[str]) -> list[Optional[np.ndarray]]:
+        """Return the cached embedding for each text, or None where it is not cached."""
+        keys = [cache_key(self.model, t, self.casefold) for t in texts]
+        found: list[Optional[np.ndarray]] = [None] * len(texts)
+        with self._lock:
+            missing = {}
+            for i, key in enumerate(keys):
+                emb = self._memory.get(key)
+                if emb is not None:
+                    self._memory.move_to_end(key)
+                    found[i] = emb
+                    self.hits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+
+            if missing and self._disk is not None:
+                marks = ",".join("?" * len(missing))
+                rows = self._disk.execute(
+                    f"SELECT key, dim, vector FROM embedding_cache WHERE key IN ({marks})", list(missing)
+                ).fetchall()
+                for key, dim, blob in rows:
+                    emb = VectorCodec.decode(blob, "float32", dim)
+                    self._remember(key, emb)
+                    for i in missing.pop(key):
+                        found[i] = emb
+                        self.disk_hits += 1
+
+            self.misses += sum(len(idx) for idx in missing.values())
+        return found
+
+    def put_many(self, texts: list[str], embeddings):
+        rows = []
+        with self._lock:
+            for text, emb in zip(texts, embeddings):
+                key = cache_key(self.model, text, self.casefold)
+                emb = np.asarray(emb, dtype=np.float32)
+                self._remember(key, emb)
+                rows.append((key, self.model, emb.shape[0], VectorCodec.encode(emb, "float32")))
+            if rows and self._disk is not None:
+                self._disk.executemany("INSERT OR REPLACE INTO embedding_cache VALUES (?, ?, ?, ?)", rows)
+                self._disk.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "persistent": self._disk is not None,
+            }
+
+
+embedding_cache = EmbeddingCache(
+    settings.EMBEDDING_MODEL,
+    settings.EMBEDDING_CACHE_SIZE,
+    settings.EMBEDDING_CACHE_PATH or None,
+)
@@ -1,9 +1,112 @@
 from app.utils.jokes_db import JokesDB
-from datetime import date
+from app.core.config import settings
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Optional
+import asyncio
+import logging
+import random
 import httpx
 
+logger = logging.getLogger(__name__)
+
+
+class JokePrefetcher:
+    """Shared upstream client plus a ring buffer of jokes fetched ahead of time.
+
+    Requests are served from the buffer; a background task tops it back up
+    whenever it drops below the low-water mark.
+    """
+
+    def __init__(self, url: str, size: int, low_water: int, timeout: float):
+        self.url = url
+        self.low_water = low_water
+        self.timeout = timeout
+        self.buffer: deque = deque(maxlen=size)
+        self.client: Optional[httpx.AsyncClient] = None
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            )
+        return self.client
+
+    async def start(self):
+        self._ensure_client()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._refill_loop())
+        self._wake.set()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def fetch(self) -> dict:
+        response = await self._ensure_client().get(self.url)
+        response.raise_for_status()
+        data = response.json()
+        return {
+            "setup": data.get("setup"),
+            "punchline": data.get("punchline"),
+            "source": "official-joke-api"
+        }
+
+    async def _refill_loop(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            while len(self.buffer) < self.buffer.maxlen:
+                try:
+                    self.buffer.append(await self.fetch())
+                except Exception as e:
+                    logger.warning("Joke prefetch failed: %s", e)
+                    await asyncio.sleep(settings.JOKES_RETRY_SECONDS)
+                    break
+            if len(self.buffer) < self.buffer.maxlen:
+                self._wake.set()
+
+    async def get(self) -> dict:
+        """Serve a joke from the buffer, the upstream, or the local list, in that order."""
+        if self._task is not None and len(self.buffer) <= self.low_water:
+            self._wake.set()
+        if self.buffer:
+            return self.buffer.popleft()
+        try:
+            return await self.fetch()
+        except Exception as e:
+            logger.warning("Joke API unavailable, using local jokes: %s", e)
+            return {"joke": random.choice(JokesDB.get_all_jokes()), "source": "local"}
+
+
+joke_prefetcher = JokePrefetcher(
+    settings.JOKES_API_URL,
+    settings.JOKES_BUFFER_SIZE,
+    settings.JOKES_BUFFER_LOW_WATER,
+    settings.JOKES_API_TIMEOUT_SECONDS,
+)
+
+
 class JokesService:
 
+    @staticmethod
+    def seconds_until_tomorrow() -> int:
+        """How long today's daily joke stays valid"""
+        now = datetime.now()
+        tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        return max(int((tomorrow - now).total_seconds()), 1)
+
     @staticmethod
     def get_daily_joke():
         today = date.today().toordinal()
@@ -15,14 +118,4 @@ class JokesService:
 
     @staticmethod
     async def get_random_joke():
-        url = "https://official-joke-api.appspot.com/random_joke"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "setup": data.get("setup"),
-                    "punchline": data.get("punchline"),
-                    "source": "official-joke-api"
-                }
-            return {"error": "Failed to fetch joke from external API."}
+        return await joke_prefetcher.get()
@@ -1,101 +1,305 @@
-import json
-import math
-from typing import List, Tuple
+import hashlib
+import logging
+import time
+from typing import Callable, List, Optional, Tuple
+import numpy as np
 from app.models import Diary, DiaryVector
+from app.services.vector_cache import build_user_vectors, UserVectors
+from app.services.vector_index import vector_index
+from app.services.embedding_cache import embedding_cache
+from app.services.answer_cache import answer_cache
+from app.services.diary_service import DiaryService
+from app.services.diary_search import DiarySearch
+from app.utils.vector_codec import VectorCodec
+from app.core.config import settings
+from app.core.clients import get_embedder, get_openai_client, get_async_openai_client
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-from openai import OpenAI
-import os
 
-# Load sentence-transformers model for local embeddings (no API quota limits)
-try:
-    from sentence_transformers import SentenceTransformer
-    embedder = SentenceTransformer('all-MiniLM-L6-v2')
-    USE_LOCAL_EMBEDDINGS = True
-except ImportError:
-    embedder = None
-    USE_LOCAL_EMBEDDINGS = False
+logger = logging.getLogger(__name__)
 
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+
+def _require_embedder():
+    # Local sentence-transformers model (no API quota limits), loaded on first use
+    embedder = get_embedder()
+    if embedder is None:
+        raise HTTPException(status_code=500, detail='Embedding service not available. Install sentence-transformers: pip install sentence-transformers')
+    return embedder
 
 
 def embed_text(text: str) -> List[float]:
-    if not USE_LOCAL_EMBEDDINGS or not embedder:
-        raise HTTPException(status_code=500, detail='Embedding service not available. Install sentence-transformers: pip install sentence-transformers')
-    try:
-        emb = embedder.encode(text, convert_to_tensor=False)
-        return emb.tolist() if hasattr(emb, 'tolist') else list(emb)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f'Embedding error: {str(e)}')
+    return embed_texts([text])[0].tolist()
+
+
+def embed_texts(texts: List[str], batch_size: int = 64) -> np.ndarray:
+    """Embed many texts at once, letting the model batch them; returns an (n, dim) array.
+
+    Texts already in the embedding cache are not re-encoded.
+    """
+    cached = embedding_cache.get_many(texts)
+    misses = [i for i, emb in enumerate(cached) if emb is None]
+    if misses:
+        embedder = _require_embedder()
+        try:
+            embs = embedder.encode([texts[i] for i in misses], batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+            embs = np.asarray(embs, dtype=np.float32)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f'Embedding error: {str(e)}')
+        embedding_cache.put_many([texts[i] for i in misses], embs)
+        for i, emb in zip(misses, embs):
+            cached[i] = emb
+    if not cached:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.vstack(cached)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def make_vector(diary_id: int, user_id: int, embedding: List[float], text_hash: Optional[str] = None) -> DiaryVector:
+    """Build a DiaryVector row storing the embedding in the configured binary format."""
+    dtype = settings.EMBEDDING_STORAGE_DTYPE
+    return DiaryVector(
+        diary_id=diary_id,
+        user_id=user_id,
+        vector=VectorCodec.encode(embedding, dtype),
+        dim=len(embedding),
+        dtype=dtype,
+        model=settings.EMBEDDING_MODEL,
+        content_hash=text_hash,
+        dirty=False,
+    )
+
+
+def load_user_vectors(db: Session, user_id: int) -> UserVectors:
+    """Read a user's stored embeddings into a normalized matrix for the vector cache."""
+    rows = (
+        db.query(DiaryVector.diary_id, DiaryVector.vector, DiaryVector.dtype, DiaryVector.dim)
+        .filter(DiaryVector.user_id == user_id)
+        .order_by(DiaryVector.diary_id)
+        .all()
+    )
+    return build_user_vectors([(diary_id, VectorCodec.decode(blob, dtype, dim)) for diary_id, blob, dtype, dim in rows])
+
+
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+
 
+def reciprocal_rank_fusion(rankings: List[List[Tuple[int, float]]], k: int) -> List[Tuple[int, float]]:
+    """Merge ranked (diary_id, score) lists: each id scores sum(1 / (k + rank)) over the lists it is in.
 
-def cosine_similarity(a: List[float], b: List[float]) -> float:
-    # simple cosine similarity
-    dot = sum(x * y for x, y in zip(a, b))
-    norm_a = math.sqrt(sum(x * x for x in a))
-    norm_b = math.sqrt(sum(y * y for y in b))
-    if norm_a == 0 or norm_b == 0:
-        return 0.0
-    return dot / (norm_a * norm_b)
+    Only ranks are used, so BM25 and cosine scores need no normalization.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, (diary_id, _) in enumerate(ranking, start=1):
+            fused[diary_id] = fused.get(diary_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
 
 
 class RAGService:
     @staticmethod
-    def index_user_diaries(db: Session, user_id: int) -> int:
-        """Compute embeddings for all diary entries for a user and store them."""
-        entries = db.query(Diary).filter(Diary.user_id == user_id).all()
-        if not entries:
+    def index_user_diaries(
+        db: Session,
+        user_id: int,
+        batch_size: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> dict:
+        """Compute embeddings for a user's unindexed diary entries and store them.
+
+        Entries are embedded `batch_size` at a time and written in transactions
+        of `chunk_size` rows; `progress(done, total)` is called after each commit.
+        """
+        batch_size = batch_size or settings.RAG_EMBED_BATCH_SIZE
+        chunk_size = chunk_size or settings.RAG_INDEX_CHUNK_SIZE
+        start = time.perf_counter()
+
+        indexed = {
+            diary_id for (diary_id,) in
+            db.query(DiaryVector.diary_id).filter(DiaryVector.user_id == user_id).all()
+        }
+        pending = [
+            (diary_id, content) for diary_id, content in
+            db.query(Diary.id, Diary.content).filter(Diary.user_id == user_id).order_by(Diary.id).all()
+            if diary_id not in indexed
+        ]
+
+        done = 0
+        for i in range(0, len(pending), chunk_size):
+            chunk = pending[i:i + chunk_size]
+            ids = [diary_id for diary_id, _ in chunk]
+            embs = embed_texts([content for _, content in chunk], batch_size)
+            db.add_all([
+                make_vector(diary_id, user_id, emb, content_hash(content))
+                for (diary_id, content), emb in zip(chunk, embs)
+            ])
+            DiaryService.bump_version(db, user_id)
+            db.commit()
+            vector_index.add(user_id, ids, embs)
+            done += len(chunk)
+            logger.info("Indexed %d/%d diary entries for user %d", done, len(pending), user_id)
+            if progress:
+                progress(done, len(pending))
+
+        elapsed = time.perf_counter() - start
+        return {
+            'indexed': done,
+            'skipped': len(indexed),
+            'elapsed_seconds': round(elapsed, 3),
+            'entries_per_second': round(done / elapsed, 1) if done and elapsed else 0.0,
+        }
+
+    @staticmethod
+    def reindex_entries(db: Session, user_id: int, diary_ids: List[int]) -> int:
+        """Bring the vectors for specific entries up to date after diary writes.
+
+        Entries whose text hash matches the stored vector are only marked clean;
+        changed or new entries are re-embedded in one batch. Users who have
+        never been indexed are skipped, as in pending_entries; ensure_index
+        embeds their whole history on first retrieval. Returns the number of
+        entries embedded.
+        """
+        if not db.query(DiaryVector.id).filter(DiaryVector.user_id == user_id).first():
             return 0
-        count = 0
-        for e in entries:
-            # skip if vector already exists for diary_id
-            exists = db.query(DiaryVector).filter(DiaryVector.diary_id == e.id).first()
-            if exists:
+
+        entries = (
+            db.query(Diary.id, Diary.content)
+            .filter(Diary.user_id == user_id, Diary.id.in_(diary_ids))
+            .all()
+        )
+        existing = {
+            v.diary_id: v for v in
+            db.query(DiaryVector).filter(DiaryVector.diary_id.in_(diary_ids)).all()
+        }
+
+        stale = []
+        for diary_id, content in entries:
+            text_hash = content_hash(content)
+            vec = existing.get(diary_id)
+            if vec is not None and vec.content_hash == text_hash:
+                vec.dirty = False
+                continue
+            stale.append((diary_id, content, text_hash))
+
+        # Entries that no longer exist: drop their vectors
+        live = {diary_id for diary_id, _ in entries}
+        deleted = [diary_id for diary_id in diary_ids if diary_id not in live]
+        for diary_id in deleted:
+            if diary_id in existing:
+                db.delete(existing[diary_id])
+
+        embs = embed_texts([content for _, content, _ in stale], settings.RAG_EMBED_BATCH_SIZE) if stale else []
+        replaced = False
+        for (diary_id, _, text_hash), emb in zip(stale, embs):
+            new = make_vector(diary_id, user_id, emb, text_hash)
+            vec = existing.get(diary_id)
+            if vec is None:
+                db.add(new)
                 continue
-            emb = embed_text(e.content)
-            vec = DiaryVector(diary_id=e.id, user_id=e.user_id, embedding=json.dumps(emb))
-            db.add(vec)
-            count += 1
+            replaced = True
+            for field in ('vector', 'dim', 'dtype', 'model', 'content_hash', 'dirty'):
+                setattr(vec, field, getattr(new, field))
+        if stale or deleted:
+            # retrieval results change, so cached answers for this user are stale
+            DiaryService.bump_version(db, user_id)
         db.commit()
-        return count
+
+        if deleted or replaced:
+            vector_index.invalidate(user_id)
+        elif stale:
+            vector_index.add(user_id, [diary_id for diary_id, _, _ in stale], embs)
+        return len(stale)
+
+    @staticmethod
+    def pending_entries(db: Session) -> List[Tuple[int, int]]:
+        """(user_id, diary_id) pairs needing embedding: dirty vectors, and unindexed
+        entries of users who already have an index."""
+        dirty = db.query(DiaryVector.user_id, DiaryVector.diary_id).filter(DiaryVector.dirty.is_(True)).all()
+        indexed_users = db.query(DiaryVector.user_id).distinct()
+        missing = (
+            db.query(Diary.user_id, Diary.id)
+            .outerjoin(DiaryVector, DiaryVector.diary_id == Diary.id)
+            .filter(DiaryVector.id.is_(None), Diary.user_id.in_(indexed_users))
+            .all()
+        )
+        return [tuple(r) for r in dirty] + [tuple(r) for r in missing]
 
     @staticmethod
     def ensure_index(db: Session, user_id: int):
-        # create vectors if none exist
-        existing = db.query(DiaryVector).filter(DiaryVector.user_id == user_id).first()
-        if not existing:
+        # embed any entry that has no vector yet, not just users with no vectors at all
+        missing = (
+            db.query(Diary.id)
+            .outerjoin(DiaryVector, DiaryVector.diary_id == Diary.id)
+            .filter(Diary.user_id == user_id, DiaryVector.id.is_(None))
+            .first()
+        )
+        if missing:
             RAGService.index_user_diaries(db, user_id)
 
     @staticmethod
-    def query_user_diaries(db: Session, user_id: int, question: str, top_k: int = 5) -> Tuple[str, List[dict]]:
-        """Run a RAG query: find top_k similar diary entries and ask LLM to answer."""
-        if not question:
-            raise HTTPException(status_code=400, detail='Question is required')
+    def resolve_mode(db: Session, mode: Optional[str]) -> str:
+        """The retrieval mode to use: the requested one or the configured default.
+
+        Without the diary_fts index, hybrid degrades to vector and lexical is refused.
+        """
+        mode = mode or settings.RAG_RETRIEVAL_MODE
+        if mode not in RETRIEVAL_MODES:
+            raise HTTPException(status_code=400, detail=f'Unknown retrieval mode: {mode}')
+        if mode != 'vector' and not DiarySearch.available(db):
+            if mode == 'lexical':
+                raise HTTPException(status_code=400, detail='Lexical retrieval needs the diary_fts index (SQLite with FTS5)')
+            return 'vector'
+        return mode
+
+    @staticmethod
+    def rank_entries(db: Session, user_id: int, question: str, top_k: int, mode: str) -> List[Tuple[int, float]]:
+        """Top (diary_id, score) pairs for the question using an already resolved mode."""
+        if mode == 'lexical':
+            # BM25 only: no embedding and no vector scan
+            return DiarySearch.bm25(db, user_id, question, top_k)
 
         RAGService.ensure_index(db, user_id)
+        version = DiaryService.get_version(db, user_id)
+        q_emb = np.asarray(embed_text(question), dtype=np.float32)
+        if mode == 'vector':
+            return vector_index.search(user_id, version, q_emb, top_k, lambda: load_user_vectors(db, user_id))
 
-        vectors = db.query(DiaryVector).filter(DiaryVector.user_id == user_id).all()
-        if not vectors:
-            raise HTTPException(status_code=404, detail='No indexed diary vectors for user')
+        candidates = max(settings.RAG_HYBRID_CANDIDATES, top_k)
+        semantic = vector_index.search(user_id, version, q_emb, candidates, lambda: load_user_vectors(db, user_id))
+        lexical = DiarySearch.bm25(db, user_id, question, candidates)
+        return reciprocal_rank_fusion([semantic, lexical], settings.RAG_RRF_K)[:top_k]
 
-        q_emb = embed_text(question)
-        scored = []
-        for v in vectors:
-            emb = json.loads(v.embedding)
-            sim = cosine_similarity(q_emb, emb)
-            scored.append((sim, v))
-        scored.sort(key=lambda x: x[0], reverse=True)
-        top = scored[:top_k]
+    @staticmethod
+    def retrieve_contexts(db: Session, user_id: int, question: str, top_k: int = 5, mode: Optional[str] = None) -> List[dict]:
+        """Find the top_k diary entries for the question.
 
-        # gather diary texts
+        mode is "vector" (embedding similarity), "lexical" (BM25 keyword match)
+        or "hybrid" (both, fused by reciprocal rank); None uses RAG_RETRIEVAL_MODE.
+        """
+        if not question:
+            raise HTTPException(status_code=400, detail='Question is required')
+
+        mode = RAGService.resolve_mode(db, mode)
+        top = RAGService.rank_entries(db, user_id, question, top_k, mode)
+        if not top:
+            if mode == 'lexical':
+                raise HTTPException(status_code=404, detail='No diary entries match the question')
+            raise HTTPException(status_code=404, detail='No indexed diary vectors for user')
+
+        # gather diary texts in one query, keeping score order
+        diaries = {d.id: d for d in db.query(Diary).filter(Diary.id.in_([diary_id for diary_id, _ in top])).all()}
         contexts = []
-        for score, v in top:
-            diary = db.query(Diary).filter(Diary.id == v.diary_id).first()
+        for diary_id, score in top:
+            diary = diaries.get(diary_id)
             if diary:
                 contexts.append({'date': str(diary.date), 'content': diary.content, 'score': score})
+        return contexts
 
-        # Build prompt for LLM
+    @staticmethod
+    def build_messages(question: str, contexts: List[dict]) -> List[dict]:
+        """Build the LLM messages for answering a question from retrieved diary entries."""
         system = (
             "You are an assistant that answers user questions using only the provided diary entries. "
             "When relevant, reference the date of the diary entry. If you don't know, say you don't know."
@@ -110,15 +314,65 @@ class RAGService:
             "Here are the most relevant diary entries:\n" + "\n\n".join(context_texts) +
             "\n\nAnswer the following question based on the above entries:\n" + question + "\n\nProvide a concise helpful answer and mention the entry dates you relied on."
         )
+        return [{'role': 'system', 'content': system},
+                {'role': 'user', 'content': prompt}]
+
+    @staticmethod
+    def answer_cache_key(db: Session, user_id: int, question: str) -> Tuple[int, np.ndarray]:
+        """(diary version, question embedding) identifying a question against the current diary.
+
+        New entries are indexed first, since that bumps the version. Read the key
+        once before retrieval and store the answer under that same key.
+        """
+        if not question:
+            raise HTTPException(status_code=400, detail='Question is required')
+        RAGService.ensure_index(db, user_id)
+        return DiaryService.get_version(db, user_id), embed_texts([question])[0]
+
+    @staticmethod
+    def uses_answer_cache(mode: str, bypass_cache: bool) -> bool:
+        """Whether to consult the answer cache. Its key is a question embedding, which
+        lexical retrieval otherwise never needs, so lexical answers are not cached."""
+        return not bypass_cache and mode != 'lexical'
+
+    @staticmethod
+    def cached_answer(key: Tuple[int, np.ndarray], user_id: int, top_k: int, mode: str) -> Optional[Tuple[str, List[dict]]]:
+        """Answer from the semantic answer cache if a close enough question was already asked."""
+        version, q_emb = key
+        return answer_cache.get(user_id, version, q_emb, top_k, mode)
+
+    @staticmethod
+    def store_answer(key: Tuple[int, np.ndarray], user_id: int, top_k: int, mode: str, answer: str, contexts: List[dict]):
+        version, q_emb = key
+        answer_cache.put(user_id, version, q_emb, top_k, answer, contexts, mode)
+
+    @staticmethod
+    def query_user_diaries(
+        db: Session, user_id: int, question: str, top_k: int = 5, use_cache: bool = True, mode: Optional[str] = None
+    ) -> Tuple[str, List[dict], bool]:
+        """Run a RAG query: find top_k relevant diary entries and ask LLM to answer.
+
+        Returns (answer, contexts, cached); cached is True when the answer came
+        from the semantic answer cache instead of the LLM.
+        """
+        mode = RAGService.resolve_mode(db, mode)
+        use_cache = RAGService.uses_answer_cache(mode, bypass_cache=not use_cache)
+        if use_cache:
+            key = RAGService.answer_cache_key(db, user_id, question)
+            hit = RAGService.cached_answer(key, user_id, top_k, mode)
+            if hit is not None:
+                return hit[0], hit[1], True
+
+        contexts = RAGService.retrieve_contexts(db, user_id, question, top_k, mode)
 
         try:
             # use chat completions (OpenAI API for LLM response)
+            client = get_openai_client()
             if not client:
                 raise HTTPException(status_code=500, detail='OpenAI API key not configured for LLM responses')
             resp = client.chat.completions.create(
-                model='gpt-3.5-turbo',
-                messages=[{'role': 'system', 'content': system},
-                          {'role': 'user', 'content': prompt}],
+                model=settings.RAG_MODEL,
+                messages=RAGService.build_messages(question, contexts),
                 max_tokens=512,
                 temperature=0.2,
             )
@@ -126,4 +380,27 @@ class RAGService:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f'LLM error: {str(e)}')
 
-        return answer, contexts
\ No newline at end of file
+        if use_cache:
+            # Under the version read before retrieval: a write since then must not be served this answer
+            RAGService.store_answer(key, user_id, top_k, mode, answer, contexts)
+        return answer, contexts, False
+
+    @staticmethod
+    async def stream_answer(question: str, contexts: List[dict]):
+        """Stream the LLM answer for already-retrieved contexts and yield text chunks."""
+        client = get_async_openai_client()
+        if not client:
+            raise RuntimeError('OpenAI API key not configured for LLM responses')
+        stream = await client.chat.completions.create(
+            model=settings.RAG_MODEL,
+            messages=RAGService.build_messages(question, contexts),
+            max_tokens=512,
+            temperature=0.2,
+            stream=True,
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+
+from app.core.config import settings
+from app.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class ReindexWorker:
+    """Background thread that re-embeds diary entries after writes.
+
+    Diary writes call `mark_dirty`; each mark pushes the entry's deadline
+    `debounce` seconds out, so a burst of edits to one entry is embedded
+    once after the user stops typing. The thread starts on first use and,
+    on start, also picks up dirty or unindexed entries left by a previous
+    process.
+    """
+
+    def __init__(self, debounce: float):
+        self.debounce = debounce
+        self._due: dict[int, tuple[int, float]] = {}  # diary_id -> (user_id, deadline)
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def mark_dirty(self, user_id: int, diary_id: int):
+        with self._cond:
+            self._due[diary_id] = (user_id, time.monotonic() + self.debounce)
+            self._cond.notify()
+        self.start()
+
+    def mark_dirty_many(self, user_id: int, diary_ids: list[int]):
+        """mark_dirty for a batch of entries, e.g. after a bulk import"""
+        if not diary_ids:
+            return
+        with self._cond:
+            deadline = time.monotonic() + self.debounce
+            for diary_id in diary_ids:
+                self._due[diary_id] = (user_id, deadline)
+            self._cond.notify()
+        self.start()
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="reindex-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._due)
+
+    def _take_due(self) -> Optional[dict[int, list[int]]]:
+        """Block until some entries are due; return them grouped by user, or None on stop."""
+        with self._cond:
+            while not self._stopping:
+                now = time.monotonic()
+                due = [d for d, (_, deadline) in self._due.items() if deadline <= now]
+                if due:
+                    by_user = defaultdict(list)
+                    for diary_id in due:
+                        user_id, _ = self._due.pop(diary_id)
+                        by_user[user_id].append(diary_id)
+                    return by_user
+                wait = min((deadline for _, deadline in self._due.values()), default=None)
+                self._cond.wait(None if wait is None else max(wait - now, 0))
+            return None
+
+    def _recover(self):
+        from app.services.rag_service import RAGService
+
+        db = SessionLocal()
+        try:
+            pending = RAGService.pending_entries(db)
+        finally:
+            db.close()
+        with self._cond:
+            now = time.monotonic()
+            for user_id, diary_id in pending:
+                self._due.setdefault(diary_id, (user_id, now))
+
+    def _run(self):
+        # Imported here so diary writes don't pull the embedding model into every process
+        from app.services.rag_service import RAGService
+
+        try:
+            self._recover()
+        except Exception:
+            logger.exception("Could not scan for unindexed diary entries")
+
+        while True:
+            batch = self._take_due()
+            if batch is None:
+                return
+            for user_id, diary_ids in batch.items():
+                db = SessionLocal()
+                try:
+                    count = RAGService.reindex_entries(db, user_id, diary_ids)
+                    logger.info("Re-embedded %d of %d dirty entries for user %d", count, len(diary_ids), user_id)
+                except Exception:
+                    logger.exception("Re-embedding failed for user %d", user_id)
+                finally:
+                    db.close()
+
+
+reindex_worker = ReindexWorker(settings.RAG_REINDEX_DEBOUNCE_SECONDS)
@@ -1,11 +1,40 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.models import User, UserRole
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import Optional
+from app.models import User, UserCounter, UserRole
 from app.schemas import UserCreate, UserUpdate
-from app.core.security import hash_password, verify_password
+from app.core.security import (
+    hash_password, hash_password_async, verify_password, verify_password_async, needs_rehash,
+)
 from fastapi import HTTPException
 
 
+TOTAL_COUNTER = "total"
+
+
+def role_counter(role: UserRole) -> str:
+    return f"role:{role.value}"
+
+
+def counter_updates(dialect: str, deltas: dict[str, int]) -> list:
+    """Upserts applying deltas to user_counters; run them in the same transaction as the user change"""
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statements = []
+    for name, delta in deltas.items():
+        if delta:
+            stmt = insert(UserCounter).values(name=name, count=delta)
+            statements.append(stmt.on_conflict_do_update(
+                index_elements=[UserCounter.name], set_={"count": UserCounter.count + delta}
+            ))
+    return statements
+
+
+def role_change_deltas(old_role: UserRole, new_role: UserRole) -> dict[str, int]:
+    return {role_counter(old_role): -1, role_counter(new_role): 1}
+
+
 class UserService:
     """Service for managing user operations"""
 
@@ -27,6 +56,8 @@ class UserService:
             role=user_data.role,
         )
         db.add(db_user)
+        for stmt in counter_updates(db.bind.dialect.name, {TOTAL_COUNTER: 1, role_counter(user_data.role): 1}):
+            db.execute(stmt)
         db.commit()
         db.refresh(db_user)
         return db_user
@@ -48,9 +79,11 @@ class UserService:
         return user
 
     @staticmethod
-    def get_all_users(db: Session, skip: int = 0, limit: int = 10) -> list[User]:
-        """Get all users with pagination"""
-        return db.query(User).offset(skip).limit(limit).all()
+    def get_all_users(db: Session, skip: int = 0, limit: int = 10, cursor: Optional[int] = None) -> list[User]:
+        """Get all users in id order; pass the last id seen as cursor for the next page (skip is legacy)"""
+        query = db.query(User).order_by(User.id)
+        query = query.filter(User.id > cursor) if cursor is not None else query.offset(skip)
+        return query.limit(limit).all()
 
     @staticmethod
     def update_user(db: Session, user_id: int, user_data: UserUpdate) -> User:
@@ -58,9 +91,22 @@ class UserService:
         user = UserService.get_user_by_id(db, user_id)
 
         update_data = user_data.model_dump(exclude_unset=True)
+        new_role = update_data.pop("role", None)
         for field, value in update_data.items():
             setattr(user, field, value)
 
+        old_role = user.role
+        if new_role is not None and new_role != old_role:
+            # Only the request that actually flips the role moves the counters
+            changed = db.execute(
+                update(User).where(User.id == user.id, User.role == old_role).values(role=new_role)
+            ).rowcount
+            if not changed:
+                db.rollback()
+                raise HTTPException(status_code=409, detail="User was modified concurrently, please retry")
+            for stmt in counter_updates(db.bind.dialect.name, role_change_deltas(old_role, new_role)):
+                db.execute(stmt)
+
         db.add(user)
         db.commit()
         db.refresh(user)
@@ -69,8 +115,11 @@ class UserService:
     @staticmethod
     def delete_user(db: Session, user_id: int) -> bool:
         """Delete a user"""
-        user = UserService.get_user_by_id(db, user_id)
-        db.delete(user)
+        role = db.execute(delete(User).where(User.id == user_id).returning(User.role)).scalar_one_or_none()
+        if role is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        for stmt in counter_updates(db.bind.dialect.name, {TOTAL_COUNTER: -1, role_counter(role): -1}):
+            db.execute(stmt)
         db.commit()
         return True
 
@@ -80,6 +129,13 @@ class UserService:
         user = db.query(User).filter(User.email == email).first()
         if not user or not verify_password(password, user.password):
             raise HTTPException(status_code=401, detail="Invalid email or password")
+
+        # Upgrade hashes made with an old work factor while we have the plain password
+        if needs_rehash(user.password):
+            user.password = hash_password(password)
+            db.add(user)
+            db.commit()
+            db.refresh(user)
         return user
 
     @staticmethod
@@ -97,11 +153,152 @@ class UserService:
         return user
 
     @staticmethod
-    def get_users_by_role(db: Session, role: UserRole, skip: int = 0, limit: int = 10) -> list[User]:
-        """Get users filtered by role"""
-        return db.query(User).filter(User.role == role).offset(skip).limit(limit).all()
+    def get_users_by_role(
+        db: Session, role: UserRole, skip: int = 0, limit: int = 10, cursor: Optional[int] = None
+    ) -> list[User]:
+        """Get users filtered by role, in id order; cursor is the last id seen"""
+        query = db.query(User).filter(User.role == role).order_by(User.id)
+        query = query.filter(User.id > cursor) if cursor is not None else query.offset(skip)
+        return query.limit(limit).all()
 
     @staticmethod
     def user_count(db: Session) -> int:
-        """Get total count of users"""
-        return db.query(func.count(User.id)).scalar()
+        """Get total count of users from the maintained counter"""
+        count = db.query(UserCounter.count).filter(UserCounter.name == TOTAL_COUNTER).scalar()
+        return count or 0
+
+
+class AsyncUserService:
+    """UserService over an AsyncSession, for async endpoints.
+
+    bcrypt work runs in the password process pool via hash_async/check_async.
+    The coroutine awaits the pool's future directly, so neither the event loop
+    nor a worker thread is held while it hashes (BCRYPT_WORKERS=0 falls back
+    to a thread).
+    """
+
+    @staticmethod
+    async def create_user(db: AsyncSession, user_data: UserCreate) -> User:
+        """Create a new user"""
+        existing_user = await db.scalar(select(User.id).where(User.email == user_data.email))
+        if existing_user:
+            raise HTTPException(status_code=400, detail="Email already registered")
+
+        hashed_password = await hash_password_async(user_data.password)
+        db_user = User(
+            name=user_data.name,
+            email=user_data.email,
+            password=hashed_password,
+            age=user_data.age,
+            role=user_data.role,
+        )
+        db.add(db_user)
+        for stmt in counter_updates(db.bind.dialect.name, {TOTAL_COUNTER: 1, role_counter(user_data.role): 1}):
+            await db.execute(stmt)
+        await db.commit()
+        await db.refresh(db_user)
+        return db_user
+
+    @staticmethod
+    async def get_user_by_id(db: AsyncSession, user_id: int) -> User:
+        """Get user by ID"""
+        user = await db.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return user
+
+    @staticmethod
+    async def get_all_users(
+        db: AsyncSession, skip: int = 0, limit: int = 10, cursor: Optional[int] = None
+    ) -> list[User]:
+        """Get all users in id order; pass the last id seen as cursor for the next page (skip is legacy)"""
+        stmt = select(User).order_by(User.id)
+        stmt = stmt.where(User.id > cursor) if cursor is not None else stmt.offset(skip)
+        return list(await db.scalars(stmt.limit(limit)))
+
+    @staticmethod
+    async def update_user(db: AsyncSession, user_id: int, user_data: UserUpdate) -> User:
+        """Update user details"""
+        user = await AsyncUserService.get_user_by_id(db, user_id)
+
+        update_data = user_data.model_dump(exclude_unset=True)
+        new_role = update_data.pop("role", None)
+        for field, value in update_data.items():
+            setattr(user, field, value)
+
+        old_role = user.role
+        if new_role is not None and new_role != old_role:
+            # Only the request that actually flips the role moves the counters
+            result = await db.execute(
+                update(User).where(User.id == user.id, User.role == old_role).values(role=new_role)
+            )
+            if not result.rowcount:
+                await db.rollback()
+                raise HTTPException(status_code=409, detail="User was modified concurrently, please retry")
+            for stmt in counter_updates(db.bind.dialect.name, role_change_deltas(old_role, new_role)):
+                await db.execute(stmt)
+
+        await db.commit()
+        await db.refresh(user)
+        return user
+
+    @staticmethod
+    async def delete_user(db: AsyncSession, user_id: int) -> bool:
+        """Delete a user"""
+        role = await db.scalar(delete(User).where(User.id == user_id).returning(User.role))
+        if role is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        for stmt in counter_updates(db.bind.dialect.name, {TOTAL_COUNTER: -1, role_counter(role): -1}):
+            await db.execute(stmt)
+        await db.commit()
+        return True
+
+    @staticmethod
+    async def authenticate_user(db: AsyncSession, email: str, password: str) -> User:
+        """Authenticate user with email and password"""
+        user = await db.scalar(select(User).where(User.email == email))
+        if not user or not await verify_password_async(password, user.password):
+            raise HTTPException(status_code=401, detail="Invalid email or password")
+
+        # Upgrade hashes made with an old work factor while we have the plain password
+        if needs_rehash(user.password):
+            user.password = await hash_password_async(password)
+            await db.commit()
+            await db.refresh(user)
+        return user
+
+    @staticmethod
+    async def change_password(db: AsyncSession, user_id: int, old_password: str, new_password: str) -> User:
+        """Change user password"""
+        user = await AsyncUserService.get_user_by_id(db, user_id)
+
+        if not await verify_password_async(old_password, user.password):
+            raise HTTPException(status_code=401, detail="Current password is incorrect")
+
+        user.password = await hash_password_async(new_password)
+        await db.commit()
+        await db.refresh(user)
+        return user
+
+    @staticmethod
+    async def get_users_by_role(
+        db: AsyncSession, role: UserRole, skip: int = 0, limit: int = 10, cursor: Optional[int] = None
+    ) -> list[User]:
+        """Get users filtered by role, in id order; cursor is the last id seen"""
+        stmt = select(User).where(User.role == role).order_by(User.id)
+        stmt = stmt.where(User.id > cursor) if cursor is not None else stmt.offset(skip)
+        return list(await db.scalars(stmt.limit(limit)))
+
+    @staticmethod
+    async def user_count(db: AsyncSession) -> int:
+        """Get total count of users from the maintained counter"""
+        count = await db.scalar(select(UserCounter.count).where(UserCounter.name == TOTAL_COUNTER))
+        return count or 0
+
+    @staticmethod
+    async def role_counts(db: AsyncSession) -> dict[str, int]:
+        """Users per role from the maintained counters"""
+        rows = await db.execute(select(UserCounter.name, UserCounter.count).where(UserCounter.name.like("role:%")))
+        counts = {role.value: 0 for role in UserRole}
+        counts.update({name.split(":", 1)[1]: count for name, count in rows})
+        return counts
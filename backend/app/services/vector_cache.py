@@ -0,0 +1,118 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+
+class UserVectors:
+    """Pre-normalized embedding matrix for one user, with diary ids row-aligned."""
+
+    __slots__ = ("diary_ids", "matrix")
+
+    def __init__(self, diary_ids: np.ndarray, matrix: np.ndarray):
+        self.diary_ids = diary_ids
+        self.matrix = matrix
+
+    @property
+    def nbytes(self) -> int:
+        return self.diary_ids.nbytes + self.matrix.nbytes
+
+    def top_k(self, query: np.ndarray, k: int) -> list[Tuple[int, float]]:
+        """Return up to k (diary_id, cosine score) pairs, best first."""
+        n = len(self.diary_ids)
+        if n == 0 or k <= 0:
+            return []
+        q = normalize(np.asarray(query, dtype=np.float32))
+        scores = self.matrix @ q
+        k = min(k, n)
+        if k < n:
+            idx = np.argpartition(scores, -k)[-k:]
+        else:
+            idx = np.arange(n)
+        idx = idx[np.argsort(scores[idx])[::-1]]
+        return [(int(self.diary_ids[i]), float(scores[i])) for i in idx]
+
+
+def normalize(arr: np.ndarray) -> np.ndarray:
+    """L2-normalize a vector or each row of a matrix; zero rows stay zero."""
+    if arr.ndim == 1:
+        norm = np.linalg.norm(arr)
+        return arr / norm if norm else arr
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return arr / norms
+
+
+def build_user_vectors(rows: list[Tuple[int, np.ndarray]]) -> UserVectors:
+    """Stack (diary_id, embedding) rows into a normalized float32 matrix."""
+    if not rows:
+        return UserVectors(np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32))
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    matrix = np.vstack([np.asarray(r[1], dtype=np.float32) for r in rows])
+    return UserVectors(ids, np.ascontiguousarray(normalize(matrix), dtype=np.float32))
+
+
+class UserVectorCache:
+    """Process-wide LRU of per-user embedding matrices, bounded by total bytes.
+
+    Entries are keyed on the user's diary version, like the answer cache, so a
+    matrix loaded before a reindex or a write in another process is not reused.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[int, Tuple[int, UserVectors]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, version: int, loader: Callable[[], UserVectors]) -> UserVectors:
+        """Return the cached matrix for a user at `version`, building it with loader otherwise.
+
+        Read `version` before calling, so rows the loader sees are at least that new.
+        """
+        with self._lock:
+            cached = self._entries.get(user_id)
+            if cached is not None and cached[0] == version:
+                self._entries.move_to_end(user_id)
+                return cached[1]
+        entry = loader()
+        self.put(user_id, version, entry)
+        return entry
+
+    def put(self, user_id: int, version: int, entry: UserVectors):
+        with self._lock:
+            old = self._entries.get(user_id)
+            if old is not None:
+                if old[0] > version:
+                    # A newer matrix was cached while this one loaded
+                    return
+                del self._entries[user_id]
+                self._bytes -= old[1].nbytes
+            if entry.nbytes > self.max_bytes:
+                return
+            self._entries[user_id] = (version, entry)
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Drop one user's matrix, or every matrix when user_id is None."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            old = self._entries.pop(user_id, None)
+            if old is not None:
+                self._bytes -= old[1].nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"users": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+vector_cache = UserVectorCache(settings.RAG_VECTOR_CACHE_MAX_BYTES)
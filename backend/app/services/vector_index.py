@@ -0,0 +1,252 @@
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.vector_cache import UserVectors, normalize, vector_cache
+
+Loader = Callable[[], UserVectors]
+
+
+class VectorIndex(ABC):
+    """Per-user nearest-neighbour index over diary embeddings.
+
+    `loader` returns every stored vector for the user and is only called
+    when the backend has nothing usable in memory or on disk. `version` is
+    the user's diary version, read before the search.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def search(self, user_id: int, version: int, query: np.ndarray, k: int, loader: Loader) -> list[Tuple[int, float]]:
+        """Return up to k (diary_id, cosine score) pairs, best first."""
+
+    @abstractmethod
+    def add(self, user_id: int, diary_ids: list[int], embeddings: list):
+        """Record newly stored vectors for a user."""
+
+    @abstractmethod
+    def invalidate(self, user_id: Optional[int] = None):
+        """Forget a user's index so it is rebuilt from the database on next search."""
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force scan over the cached per-user matrix."""
+
+    name = "exact"
+
+    def search(self, user_id, version, query, k, loader):
+        return vector_cache.get(user_id, version, loader).top_k(query, k)
+
+    def add(self, user_id, diary_ids, embeddings):
+        vector_cache.invalidate(user_id)
+
+    def invalidate(self, user_id=None):
+        vector_cache.invalidate(user_id)
+
+
+class IVFUserIndex:
+    """Inverted-file index for one user: k-means centroids plus per-row list assignment."""
+
+    def __init__(self, centroids: np.ndarray, diary_ids: np.ndarray, matrix: np.ndarray,
+                 assign: np.ndarray, trained_size: int):
+        self.centroids = centroids
+        self.diary_ids = diary_ids
+        self.matrix = matrix
+        self.assign = assign
+        self.trained_size = trained_size
+        self._lists = None
+
+    @classmethod
+    def train(cls, vectors: UserVectors, min_train: int, iterations: int = 10, seed: int = 0) -> "IVFUserIndex":
+        n = len(vectors.diary_ids)
+        matrix = vectors.matrix
+        if n < min_train:
+            # Too small to cluster usefully: one list, i.e. an exact scan
+            nlist = 1
+        else:
+            nlist = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        if n:
+            centroids = matrix[rng.choice(n, size=nlist, replace=False)].copy()
+        else:
+            centroids = np.zeros((0, 0), dtype=np.float32)
+        assign = np.zeros(n, dtype=np.int32)
+        if nlist > 1:
+            # Spherical k-means: assign by cosine, re-normalize the means
+            for _ in range(iterations):
+                assign = np.argmax(matrix @ centroids.T, axis=1).astype(np.int32)
+                for c in range(nlist):
+                    members = matrix[assign == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                centroids = normalize(centroids).astype(np.float32)
+            assign = np.argmax(matrix @ centroids.T, axis=1).astype(np.int32)
+        return cls(centroids, vectors.diary_ids.copy(), matrix.copy(), assign, n)
+
+    def add(self, diary_ids: np.ndarray, matrix: np.ndarray):
+        if not len(self.centroids):
+            self.centroids = matrix[:1].copy()
+            self.matrix = np.empty((0, matrix.shape[1]), dtype=np.float32)
+        assign = np.argmax(matrix @ self.centroids.T, axis=1).astype(np.int32)
+        self.diary_ids = np.concatenate([self.diary_ids, diary_ids])
+        self.matrix = np.vstack([self.matrix, matrix])
+        self.assign = np.concatenate([self.assign, assign])
+        self._lists = None
+
+    def _list_rows(self) -> list[np.ndarray]:
+        """Row indices grouped by list, rebuilt lazily after adds."""
+        if self._lists is None:
+            order = np.argsort(self.assign, kind="stable")
+            bounds = np.searchsorted(self.assign[order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[c]:bounds[c + 1]] for c in range(len(self.centroids))]
+        return self._lists
+
+    def search(self, query: np.ndarray, k: int, nprobe: int) -> list[Tuple[int, float]]:
+        n = len(self.diary_ids)
+        if n == 0 or k <= 0:
+            return []
+        q = normalize(np.asarray(query, dtype=np.float32))
+        nlist = len(self.centroids)
+        if nprobe < nlist:
+            probes = np.argpartition(self.centroids @ q, -nprobe)[-nprobe:]
+            lists = self._list_rows()
+            rows = np.concatenate([lists[c] for c in probes])
+        else:
+            rows = np.arange(n)
+        return UserVectors(self.diary_ids[rows], self.matrix[rows]).top_k(q, k)
+
+    def save(self, path: str):
+        # A unique temp file per writer, so processes saving the same user never share one
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, centroids=self.centroids, diary_ids=self.diary_ids, matrix=self.matrix,
+                         assign=self.assign, trained_size=np.array(self.trained_size))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "IVFUserIndex":
+        with np.load(path) as data:
+            return cls(data["centroids"], data["diary_ids"], data["matrix"], data["assign"],
+                       int(data["trained_size"]))
+
+
+class IVFIndex(VectorIndex):
+    """Approximate search with per-user IVF indexes persisted as .npz files.
+
+    Indexes are loaded lazily on first search, appended to as diaries are
+    indexed, and retrained once they have doubled in size since training.
+    Loading, training and searching hold only the user's lock stripe, so a
+    slow rebuild for one user does not stall searches for the others.
+    """
+
+    name = "ivf"
+
+    def __init__(self, index_dir: str, nprobe: int, min_train: int, max_loaded: int = 256, lock_stripes: int = 64):
+        self.index_dir = index_dir
+        self.nprobe = nprobe
+        self.min_train = min_train
+        self.max_loaded = max_loaded
+        self._loaded: "OrderedDict[int, IVFUserIndex]" = OrderedDict()
+        # Guards _loaded only; never held while loading, training or searching
+        self._lock = threading.Lock()
+        # Serialize work on one user's index; users sharing a stripe also wait on each other
+        self._user_locks = [threading.Lock() for _ in range(lock_stripes)]
+
+    def _path(self, user_id: int) -> str:
+        return os.path.join(self.index_dir, f"user_{user_id}.npz")
+
+    def _user_lock(self, user_id: int) -> threading.Lock:
+        return self._user_locks[user_id % len(self._user_locks)]
+
+    def _remember(self, user_id: int, index: IVFUserIndex):
+        with self._lock:
+            self._loaded[user_id] = index
+            self._loaded.move_to_end(user_id)
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+
+    def _get(self, user_id: int) -> Optional[IVFUserIndex]:
+        with self._lock:
+            index = self._loaded.get(user_id)
+            if index is not None:
+                self._loaded.move_to_end(user_id)
+                return index
+        path = self._path(user_id)
+        if os.path.exists(path):
+            index = IVFUserIndex.load(path)
+            self._remember(user_id, index)
+        return index
+
+    def _build(self, user_id: int, vectors: UserVectors) -> IVFUserIndex:
+        index = IVFUserIndex.train(vectors, self.min_train)
+        os.makedirs(self.index_dir, exist_ok=True)
+        index.save(self._path(user_id))
+        self._remember(user_id, index)
+        return index
+
+    def search(self, user_id, version, query, k, loader):
+        # Kept current by add and invalidate rather than by version
+        with self._user_lock(user_id):
+            index = self._get(user_id)
+            if index is None:
+                index = self._build(user_id, loader())
+            return index.search(query, k, self.nprobe)
+
+    def add(self, user_id, diary_ids, embeddings):
+        if not diary_ids:
+            return
+        with self._user_lock(user_id):
+            index = self._get(user_id)
+            if index is None:
+                # Nothing built yet; the first search trains from the database
+                return
+            ids = np.asarray(diary_ids, dtype=np.int64)
+            # A search may have built the index from rows that already include these
+            new = ~np.isin(ids, index.diary_ids)
+            if not new.any():
+                return
+            matrix = normalize(np.asarray(embeddings, dtype=np.float32)[new])
+            index.add(ids[new], matrix)
+            if len(index.diary_ids) >= max(2 * index.trained_size, self.min_train):
+                index = self._build(user_id, UserVectors(index.diary_ids, index.matrix))
+            else:
+                index.save(self._path(user_id))
+
+    def invalidate(self, user_id=None):
+        if user_id is None:
+            with self._lock:
+                user_ids = list(self._loaded)
+            if os.path.isdir(self.index_dir):
+                user_ids += [int(f[5:-4]) for f in os.listdir(self.index_dir)
+                             if f.startswith("user_") and f.endswith(".npz")]
+        else:
+            user_ids = [user_id]
+        for uid in set(user_ids):
+            with self._user_lock(uid):
+                with self._lock:
+                    self._loaded.pop(uid, None)
+                path = self._path(uid)
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def create_vector_index(backend: str) -> VectorIndex:
+    if backend == ExactIndex.name:
+        return ExactIndex()
+    if backend == IVFIndex.name:
+        return IVFIndex(settings.RAG_INDEX_DIR, settings.RAG_IVF_NPROBE, settings.RAG_IVF_MIN_TRAIN)
+    raise ValueError(f"Unknown RAG_INDEX_BACKEND: {backend}")
+
+
+vector_index = create_vector_index(settings.RAG_INDEX_BACKEND)
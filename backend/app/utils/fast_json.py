@@ -0,0 +1,30 @@
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+# orjson is several times faster than the stdlib encoder and emits bytes directly;
+# fall back to json when it isn't installed
+try:
+    import orjson
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+except ImportError:
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=_OPTIONS)
+    return json.dumps(obj, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def ndjson_line(obj: Any) -> bytes:
+    """One NDJSON record: the serialized object plus a newline"""
+    return dumps(obj) + b"\n"
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: same output as JSONResponse, serialized with orjson when available"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
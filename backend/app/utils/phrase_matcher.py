@@ -0,0 +1,118 @@
+from collections import deque
+from typing import Iterable, Optional
+
+# Characters folded together before matching so "can’t" matches "can't"
+_CHAR_MAP = {
+    "‘": "'", "’": "'", "ʼ": "'", "`": "'",
+    "“": '"', "”": '"',
+}
+
+
+def _normalize_char(ch: str) -> str:
+    if ch.isspace():
+        return " "
+    return _CHAR_MAP.get(ch, ch).casefold()
+
+
+def normalize_phrase(text: str) -> str:
+    out = []
+    for ch in text:
+        ch = _normalize_char(ch)
+        if ch == " " and (not out or out[-1] == " "):
+            continue
+        out.append(ch)
+    return "".join(out).strip()
+
+
+class PhraseMatcher:
+    """Aho-Corasick automaton over a fixed phrase list.
+
+    Built once; scanning is linear in the text length regardless of how
+    many phrases there are. Matching is case-insensitive, treats any run of
+    whitespace as one space and folds typographic quotes.
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases = sorted({p for p in (normalize_phrase(p) for p in phrases) if p})
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[Optional[str]] = [None]  # phrase ending exactly at this state
+        self._out_link: list[int] = [0]  # nearest state on the fail chain with a phrase of its own
+        for phrase in self.phrases:
+            state = 0
+            for ch in phrase:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(None)
+                    self._out_link.append(0)
+                state = nxt
+            self._out[state] = phrase
+        self._build_fail_links()
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0) if self._goto[f].get(ch) != nxt else 0
+                fail = self._fail[nxt]
+                self._out_link[nxt] = fail if self._out[fail] is not None else self._out_link[fail]
+
+    def step(self, state: int, ch: str) -> int:
+        while state and ch not in self._goto[state]:
+            state = self._fail[state]
+        return self._goto[state].get(ch, 0)
+
+    def matches(self, state: int) -> list[str]:
+        """Phrases ending at state, longest first: its own plus those along the output links."""
+        found = [self._out[state]] if self._out[state] is not None else []
+        state = self._out_link[state]
+        while state:
+            found.append(self._out[state])
+            state = self._out_link[state]
+        return found
+
+    def scanner(self) -> "StreamScanner":
+        return StreamScanner(self)
+
+    def search(self, text: str) -> list[str]:
+        """Return every phrase occurrence in text, ordered by where it ends (longest first on ties)."""
+        return self.scanner().feed(text)
+
+
+class StreamScanner:
+    """Incremental scan state, so text arriving in chunks matches across chunk boundaries."""
+
+    __slots__ = ("matcher", "state", "_last_space", "matched")
+
+    def __init__(self, matcher: PhraseMatcher):
+        self.matcher = matcher
+        self.state = 0
+        self._last_space = True
+        self.matched: list[str] = []
+
+    def feed(self, text: str) -> list[str]:
+        """Scan the next chunk; return phrases completed within it."""
+        found = []
+        matcher = self.matcher
+        for ch in text:
+            ch = _normalize_char(ch)
+            if ch == " ":
+                if self._last_space:
+                    continue
+                self._last_space = True
+            else:
+                self._last_space = False
+            self.state = matcher.step(self.state, ch)
+            if matcher._out[self.state] is not None or matcher._out_link[self.state]:
+                found.extend(matcher.matches(self.state))
+        self.matched.extend(found)
+        return found
@@ -0,0 +1,85 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Iterator, Union
+
+
+class RecordError(ValueError):
+    """A record that could not be parsed; carries its line number"""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a UTF-8 byte stream into lines without buffering more than one partial line"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+Record = tuple[int, Union[dict, RecordError]]
+
+
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """Yield (line number, object) for each non-blank line; malformed lines yield a RecordError"""
+    line_no = 0
+    async for line in _iter_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, RecordError(line_no, f"invalid JSON ({e.msg})")
+            continue
+        if not isinstance(record, dict):
+            yield line_no, RecordError(line_no, "expected a JSON object")
+            continue
+        yield line_no, record
+
+
+def _parse_csv_record(text: str) -> list[str]:
+    rows: Iterator[list[str]] = csv.reader([text])
+    return next(rows, [])
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """Yield (line number, row dict keyed by the header) for each CSV record.
+
+    Quoted fields may span lines: physical lines are joined until the
+    record's quotes balance (RFC 4180 escapes a quote by doubling it, so
+    an odd count means a field is still open).
+    """
+    header = None
+    record, quotes, start = "", 0, 0
+    line_no = 0
+    async for line in _iter_lines(chunks):
+        line_no += 1
+        if not record:
+            start = line_no
+        record = f"{record}\n{line}" if record else line
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        text, record, quotes = record.rstrip("\r"), "", 0
+        if not text.strip():
+            continue
+        fields = _parse_csv_record(text)
+        if header is None:
+            header = [name.strip().lower() for name in fields]
+            continue
+        if len(fields) != len(header):
+            yield start, RecordError(start, f"expected {len(header)} fields, got {len(fields)}")
+            continue
+        yield start, dict(zip(header, fields))
+    if record:
+        yield start, RecordError(start, "unterminated quoted field")
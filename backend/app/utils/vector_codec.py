@@ -0,0 +1,27 @@
+import numpy as np
+
+# Storage dtypes are always little-endian so blobs are portable across hosts
+DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float16": np.dtype("<f2"),
+}
+
+
+class VectorCodec:
+    """Encode embeddings to compact binary blobs and decode them back."""
+
+    @staticmethod
+    def encode(embedding, dtype: str = "float32") -> bytes:
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+        return np.asarray(embedding, dtype=DTYPES[dtype]).tobytes()
+
+    @staticmethod
+    def decode(blob: bytes, dtype: str = "float32", dim: int | None = None) -> np.ndarray:
+        """Zero-copy view of a blob as a vector; callers must not write to it."""
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+        vec = np.frombuffer(blob, dtype=DTYPES[dtype])
+        if dim is not None and vec.shape[0] != dim:
+            raise ValueError(f"Embedding blob has {vec.shape[0]} values, header says {dim}")
+        return vec
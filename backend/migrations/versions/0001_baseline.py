@@ -0,0 +1,119 @@
+"""Baseline: the schema as created by create_all before migrations existed
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Databases created by earlier versions of the app already have some or all
+of these tables, so each one is only created if it is missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_missing(existing: set, name: str, *columns, indexes=()):
+    if name in existing:
+        return
+    op.create_table(name, *columns)
+    for index_name, index_columns, unique in indexes:
+        op.create_index(index_name, name, index_columns, unique=unique)
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "diary_vectors" in existing:
+        columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("diary_vectors")}
+        if "embedding" in columns:
+            raise RuntimeError(
+                "diary_vectors still stores JSON embeddings; run `python -m scripts.migrate_diary_vectors` first"
+            )
+
+    _create_missing(
+        existing, "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("password", sa.String(255), nullable=False),
+        sa.Column("age", sa.Integer(), nullable=True),
+        sa.Column("role", sa.Enum("ADMIN", "USER", "MODERATOR", name="userrole"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        indexes=[
+            ("ix_users_id", ["id"], False),
+            ("ix_users_name", ["name"], False),
+            ("ix_users_email", ["email"], True),
+        ],
+    )
+    _create_missing(
+        existing, "diary_entries",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        indexes=[
+            ("ix_diary_entries_id", ["id"], False),
+            ("ix_diary_entries_user_id", ["user_id"], False),
+            ("ix_diary_entries_date", ["date"], False),
+        ],
+    )
+    _create_missing(
+        existing, "diary_versions",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+    _create_missing(
+        existing, "diary_vectors",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("diary_id", sa.Integer(), sa.ForeignKey("diary_entries.id"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("vector", sa.LargeBinary(), nullable=False),
+        sa.Column("dim", sa.Integer(), nullable=False),
+        sa.Column("dtype", sa.String(16), nullable=False),
+        sa.Column("model", sa.String(128), nullable=False),
+        sa.Column("content_hash", sa.String(64), nullable=True),
+        sa.Column("dirty", sa.Boolean(), server_default="0", nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        indexes=[
+            ("ix_diary_vectors_id", ["id"], False),
+            ("ix_diary_vectors_diary_id", ["diary_id"], False),
+            ("ix_diary_vectors_user_id", ["user_id"], False),
+        ],
+    )
+    _create_missing(
+        existing, "conversations",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        indexes=[("ix_conversations_user_id", ["user_id"], False)],
+    )
+    _create_missing(
+        existing, "conversation_messages",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("conversation_id", sa.String(36), sa.ForeignKey("conversations.id"), nullable=False),
+        sa.Column("role", sa.String(16), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        indexes=[
+            ("ix_conversation_messages_id", ["id"], False),
+            ("ix_conversation_messages_conversation_id", ["conversation_id"], False),
+        ],
+    )
+
+
+def downgrade():
+    for name in (
+        "conversation_messages", "conversations", "diary_vectors",
+        "diary_versions", "diary_entries", "users",
+    ):
+        op.drop_table(name)
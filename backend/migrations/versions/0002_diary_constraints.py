@@ -0,0 +1,128 @@
+"""Unique (user_id, date) diary entries, one vector per entry, ON DELETE CASCADE
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+SQLite cannot change foreign keys in place, so the dependent tables are
+rebuilt: create the new table, copy the rows, drop the old one and rename.
+Rows left behind by earlier user/diary deletes are removed first, as the
+cascade would have done. Duplicate (user_id, date) diary entries are user
+data and are not merged automatically; the upgrade stops and lists them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def _rebuild(name: str, columns: list, indexes: list):
+    bind = op.get_bind()
+    old_columns = {c["name"] for c in sa.inspect(bind).get_columns(name)}
+    tmp = f"_{name}_new"
+    op.create_table(tmp, *columns)
+    copied = ", ".join(c.name for c in columns if isinstance(c, sa.Column) and c.name in old_columns)
+    op.execute(f"INSERT INTO {tmp} ({copied}) SELECT {copied} FROM {name}")
+    op.drop_table(name)
+    op.rename_table(tmp, name)
+    for index_name, index_columns, unique in indexes:
+        op.create_index(index_name, name, index_columns, unique=unique)
+
+
+def _fk(target: str, cascade: bool = True):
+    return sa.ForeignKey(target, ondelete="CASCADE" if cascade else None)
+
+
+def _tables(cascade: bool):
+    return [
+        ("diary_entries", [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), _fk("users.id", cascade), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        ], [
+            ("ix_diary_entries_id", ["id"], False),
+            ("ix_diary_entries_date", ["date"], False),
+            ("ix_diary_entries_user_id_date", ["user_id", "date"], True) if cascade
+            else ("ix_diary_entries_user_id", ["user_id"], False),
+        ]),
+        ("diary_versions", [
+            sa.Column("user_id", sa.Integer(), _fk("users.id", cascade), primary_key=True),
+            sa.Column("version", sa.Integer(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        ], []),
+        ("diary_vectors", [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("diary_id", sa.Integer(), _fk("diary_entries.id", cascade), nullable=False),
+            sa.Column("user_id", sa.Integer(), _fk("users.id", cascade), nullable=False),
+            sa.Column("vector", sa.LargeBinary(), nullable=False),
+            sa.Column("dim", sa.Integer(), nullable=False),
+            sa.Column("dtype", sa.String(16), nullable=False),
+            sa.Column("model", sa.String(128), nullable=False),
+            sa.Column("content_hash", sa.String(64), nullable=True),
+            sa.Column("dirty", sa.Boolean(), server_default="0", nullable=False),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        ], [
+            ("ix_diary_vectors_id", ["id"], False),
+            ("ix_diary_vectors_diary_id", ["diary_id"], cascade),
+            ("ix_diary_vectors_user_id", ["user_id"], False),
+        ]),
+        ("conversations", [
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("user_id", sa.Integer(), _fk("users.id", cascade), nullable=False),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        ], [
+            ("ix_conversations_user_id", ["user_id"], False),
+        ]),
+        ("conversation_messages", [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("conversation_id", sa.String(36), _fk("conversations.id", cascade), nullable=False),
+            sa.Column("role", sa.String(16), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        ], [
+            ("ix_conversation_messages_id", ["id"], False),
+            ("ix_conversation_messages_conversation_id", ["conversation_id"], False),
+        ]),
+    ]
+
+
+def upgrade():
+    bind = op.get_bind()
+    duplicates = bind.exec_driver_sql(
+        "SELECT user_id, date, COUNT(*) FROM diary_entries GROUP BY user_id, date HAVING COUNT(*) > 1"
+    ).fetchall()
+    if duplicates:
+        raise RuntimeError(
+            f"{len(duplicates)} (user_id, date) pairs have more than one diary entry, e.g. {duplicates[:5]}; "
+            "merge or delete the extras before upgrading"
+        )
+
+    # Orphans from deletes made before cascades existed, children first
+    op.execute("DELETE FROM diary_entries WHERE user_id NOT IN (SELECT id FROM users)")
+    op.execute(
+        "DELETE FROM diary_vectors WHERE user_id NOT IN (SELECT id FROM users) "
+        "OR diary_id NOT IN (SELECT id FROM diary_entries)"
+    )
+    # Vectors are derived data: keep the newest per entry
+    op.execute(
+        "DELETE FROM diary_vectors WHERE id NOT IN (SELECT MAX(id) FROM diary_vectors GROUP BY diary_id)"
+    )
+    op.execute("DELETE FROM diary_versions WHERE user_id NOT IN (SELECT id FROM users)")
+    op.execute("DELETE FROM conversations WHERE user_id NOT IN (SELECT id FROM users)")
+    op.execute("DELETE FROM conversation_messages WHERE conversation_id NOT IN (SELECT id FROM conversations)")
+
+    for name, columns, indexes in _tables(cascade=True):
+        _rebuild(name, columns, indexes)
+
+
+def downgrade():
+    for name, columns, indexes in _tables(cascade=False):
+        _rebuild(name, columns, indexes)
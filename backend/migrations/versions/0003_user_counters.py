@@ -0,0 +1,35 @@
+"""Maintained user counters and a (role, id) index for keyset pagination
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_counters",
+        sa.Column("name", sa.String(32), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_users_role_id", "users", ["role", "id"])
+
+    # Backfill from the current users; roles are stored by enum name, counters use the value
+    op.execute("INSERT INTO user_counters (name, count) SELECT 'total', COUNT(*) FROM users")
+    op.execute(
+        "INSERT INTO user_counters (name, count) "
+        "SELECT 'role:' || LOWER(role), COUNT(*) FROM users GROUP BY role"
+    )
+
+
+def downgrade():
+    op.drop_index("ix_users_role_id", table_name="users")
+    op.drop_table("user_counters")
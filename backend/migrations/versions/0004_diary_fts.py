@@ -0,0 +1,77 @@
+"""Full-text index over diary entry content (SQLite FTS5), kept in sync by triggers
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+diary_fts is an external-content FTS5 table: it stores only the index and
+reads the text from diary_entries, so entries are not duplicated on disk.
+The triggers mirror every insert, delete and content update (including the
+DO UPDATE branch of the import upsert). A later migration that rebuilds
+diary_entries drops these triggers with the old table and must recreate
+them.
+
+Only SQLite is handled; on other databases, or SQLite builds without FTS5,
+this revision does nothing and retrieval falls back to vectors.
+"""
+import logging
+
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+TRIGGERS = {
+    "diary_fts_ai": """
+        CREATE TRIGGER diary_fts_ai AFTER INSERT ON diary_entries BEGIN
+            INSERT INTO diary_fts (rowid, content) VALUES (new.id, new.content);
+        END
+    """,
+    "diary_fts_ad": """
+        CREATE TRIGGER diary_fts_ad AFTER DELETE ON diary_entries BEGIN
+            INSERT INTO diary_fts (diary_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        END
+    """,
+    "diary_fts_au": """
+        CREATE TRIGGER diary_fts_au AFTER UPDATE OF content ON diary_entries BEGIN
+            INSERT INTO diary_fts (diary_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            INSERT INTO diary_fts (rowid, content) VALUES (new.id, new.content);
+        END
+    """,
+}
+
+
+def _fts5_available(bind) -> bool:
+    if bind.dialect.name != "sqlite":
+        return False
+    options = {row[0] for row in bind.exec_driver_sql("PRAGMA compile_options")}
+    return "ENABLE_FTS5" in options
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not _fts5_available(bind):
+        logger.warning("Skipping diary_fts: needs SQLite built with FTS5")
+        return
+    # porter stems English words ("walked" matches "walking"); remove_diacritics 2 folds accents
+    op.execute(
+        "CREATE VIRTUAL TABLE diary_fts USING fts5("
+        "content, content='diary_entries', content_rowid='id', "
+        "tokenize='porter unicode61 remove_diacritics 2')"
+    )
+    for sql in TRIGGERS.values():
+        op.execute(sql)
+    op.execute("INSERT INTO diary_fts (diary_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.execute("DROP TABLE IF EXISTS diary_fts")
@@ -0,0 +1,120 @@
+"""Mixed diary read/write load against the default and production SQLite profiles.
+
+Run from the backend directory:
+
+    python -m scripts.bench_db_profiles [--threads 16] [--seconds 10] [--write-ratio 0.2]
+
+Each profile gets a fresh database file in a temp directory, seeded with
+users and diary entries. Worker threads then list a user's diary (reads) or
+add/edit an entry and commit (writes) for a fixed time. Reports throughput,
+latency percentiles and "database is locked" failures.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base, make_engine
+from app.models import Diary, User
+
+
+def seed(Session, users: int, entries: int):
+    db = Session()
+    db.add_all([User(name=f"user{i}", email=f"user{i}@example.com", password="x") for i in range(users)])
+    db.flush()
+    start = date(2024, 1, 1)
+    db.add_all([
+        Diary(user_id=1 + i % users, date=start + timedelta(days=i // users), content=f"entry {i} " * 20)
+        for i in range(entries)
+    ])
+    db.commit()
+    db.close()
+
+
+def run(Session, users: int, threads: int, seconds: float, write_ratio: float) -> dict:
+    reads, writes, errors = [], [], 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(seed_value: int):
+        nonlocal errors
+        rng = random.Random(seed_value)
+        while time.perf_counter() < deadline:
+            user_id = rng.randint(1, users)
+            is_write = rng.random() < write_ratio
+            db = Session()
+            start = time.perf_counter()
+            try:
+                if is_write:
+                    entry = db.query(Diary).filter(Diary.user_id == user_id).order_by(Diary.date.desc()).first()
+                    if entry is not None and rng.random() < 0.5:
+                        entry.content = f"edited {rng.random()}"
+                    else:
+                        db.add(Diary(user_id=user_id, date=date.today(), content="new entry " * 20))
+                    db.commit()
+                else:
+                    db.query(Diary).filter(Diary.user_id == user_id).order_by(Diary.date.desc()).limit(50).all()
+                elapsed = time.perf_counter() - start
+                with lock:
+                    (writes if is_write else reads).append(elapsed)
+            except OperationalError:
+                db.rollback()
+                with lock:
+                    errors += 1
+            finally:
+                db.close()
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+    def pct(values, q):
+        return statistics.quantiles(values, n=100)[q - 1] * 1000 if len(values) > 1 else 0.0
+
+    return {
+        "ops/s": (len(reads) + len(writes)) / seconds,
+        "read p50 ms": pct(reads, 50),
+        "read p95 ms": pct(reads, 95),
+        "write p50 ms": pct(writes, 50),
+        "write p95 ms": pct(writes, 95),
+        "locked": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--entries", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for profile in ("default", "production"):
+            url = f"sqlite:///{os.path.join(tmp, profile + '.db')}"
+            engine = make_engine(url, profile=profile, echo=False)
+            Base.metadata.create_all(bind=engine)
+            Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            seed(Session, args.users, args.entries)
+            results[profile] = run(Session, args.users, args.threads, args.seconds, args.write_ratio)
+            engine.dispose()
+
+    metrics = list(next(iter(results.values())))
+    print(f"{'':>14}" + "".join(f"{p:>12}" for p in results))
+    for m in metrics:
+        print(f"{m:>14}" + "".join(f"{r[m]:>12.1f}" for r in results.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Measure bcrypt login throughput inline vs. through the password pool.
+
+Run from the backend directory:
+
+    python -m scripts.bench_login [--rounds 10 12] [--workers 1 2 4] [--clients 32] [--seconds 5]
+
+Each client thread verifies a password in a loop, as concurrent logins would.
+Reports verifications/second overall and per worker process, plus how many
+requests admission control rejected.
+"""
+import argparse
+import os
+import threading
+import time
+
+from bcrypt import gensalt, hashpw
+from fastapi import HTTPException
+
+from app.core.password_pool import PasswordPool
+
+
+def run(pool: PasswordPool, hashed: str, clients: int, seconds: float) -> tuple[int, int, float]:
+    ok = rejected = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        nonlocal ok, rejected
+        while time.perf_counter() < deadline:
+            try:
+                pool.check("correct horse battery staple", hashed)
+                with lock:
+                    ok += 1
+            except HTTPException:
+                with lock:
+                    rejected += 1
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return ok, rejected, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, os.cpu_count() or 1])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--max-queue", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'rounds':>6} {'workers':>8} {'verify/s':>9} {'per core':>9} {'rejected':>9}")
+    for rounds in args.rounds:
+        hashed = hashpw(b"correct horse battery staple", gensalt(rounds)).decode()
+        for workers in args.workers:
+            pool = PasswordPool(workers, args.max_queue, queue_timeout=0.1)
+            pool.check("warm up", hashed)  # start worker processes outside the timing
+            ok, rejected, elapsed = run(pool, hashed, args.clients, args.seconds)
+            pool.shutdown()
+            rate = ok / elapsed
+            label = workers if workers else "inline"
+            print(f"{rounds:>6} {label:>8} {rate:>9.1f} {rate / max(workers, 1):>9.1f} {rejected:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Serialization time and bytes on the wire for the heaviest JSON responses.
+
+Run from the backend directory:
+
+    python -m scripts.bench_serialization [--repeat 200]
+
+Builds representative payloads (a RAG answer with full diary contexts, a
+page of 100 users, a 500-entry diary range, a 300-token chat stream) and
+compares the stdlib JSONResponse encoder with FastJSONResponse, then the
+body size uncompressed, gzipped and brotli-compressed at the configured
+levels.
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.compression import brotli
+from app.core.config import settings
+from app.utils.fast_json import FastJSONResponse, ndjson_line
+
+WORDS = (
+    "today felt long but I managed to go for a walk and call my sister about the weekend plans "
+    "work was stressful again and I could not sleep well though the evening run helped a lot"
+).split()
+
+
+def prose(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def payloads(rng: random.Random) -> dict:
+    now = datetime(2024, 6, 1, 12, 0, 0)
+    return {
+        "rag answer (10 contexts)": {
+            "answer": prose(rng, 250),
+            "contexts": [
+                {"date": date(2024, 1, 1) + timedelta(days=i), "content": prose(rng, 400), "score": rng.random()}
+                for i in range(10)
+            ],
+            "cached": False,
+        },
+        "users page (100)": [
+            {"id": i, "name": f"User {i}", "email": f"user{i}@example.com", "age": 20 + i % 50,
+             "role": "user", "created_at": now, "updated_at": now}
+            for i in range(100)
+        ],
+        "diary range (500)": {
+            "entries": [
+                {"id": i, "date": date(2022, 1, 1) + timedelta(days=i), "content": prose(rng, 120),
+                 "created_at": now, "updated_at": now}
+                for i in range(500)
+            ],
+            "next_cursor": "MjAyMy0wNS0xNnw1MDA",
+        },
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    print(f"{'payload':<26} {'stdlib us':>10} {'fast us':>9} {'raw B':>9} {'gzip B':>9} {'br B':>9}")
+    for name, payload in payloads(rng).items():
+        # Endpoints hand the encoder jsonable data (dates already strings), as FastAPI does
+        content = jsonable_encoder(payload)
+        stdlib_us = timed(lambda: JSONResponse(content), args.repeat)
+        fast_us = timed(lambda: FastJSONResponse(content), args.repeat)
+        body = FastJSONResponse(content).body
+        gz = len(gzip.compress(body, compresslevel=settings.GZIP_LEVEL))
+        br = len(brotli.compress(body, quality=settings.BROTLI_QUALITY)) if brotli is not None else float("nan")
+        print(f"{name:<26} {stdlib_us:>10.1f} {fast_us:>9.1f} {len(body):>9} {gz:>9} {br:>9}")
+
+    # Chat stream: one NDJSON line per token
+    tokens = [rng.choice(WORDS) + " " for _ in range(300)]
+    stdlib_us = timed(lambda: [json.dumps({"text": t, "done": False}) + "\n" for t in tokens], args.repeat)
+    fast_us = timed(lambda: [ndjson_line({"text": t, "done": False}) for t in tokens], args.repeat)
+    print(f"{'chat stream (300 tokens)':<26} {stdlib_us:>10.1f} {fast_us:>9.1f}   (streamed, not compressed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Compare per-request auth overhead with and without the verified-token cache.
+
+Run from the backend directory:
+
+    python -m scripts.bench_token_validation [--tokens 100] [--requests 100000]
+
+Replays requests from a pool of active users' tokens through
+validate_access_token, once with a full jwt.decode every time (the old
+behaviour) and once through the cache.
+"""
+import argparse
+import random
+import time
+
+import jwt
+
+from app.core.config import settings
+from app.core.jwt_manager import JWTManager
+from app.core.security import token_cache, validate_access_token
+
+
+def uncached(authorization: str) -> dict:
+    token = authorization.replace("Bearer ", "", 1).strip()
+    return jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=100, help="distinct active tokens")
+    parser.add_argument("--requests", type=int, default=100_000)
+    args = parser.parse_args()
+
+    headers = [
+        "Bearer " + JWTManager.create_access_token({"user_id": i, "email": f"user{i}@example.com"})
+        for i in range(args.tokens)
+    ]
+    rng = random.Random(0)
+    stream = [rng.choice(headers) for _ in range(args.requests)]
+
+    for name, fn in (("jwt.decode", uncached), ("cached", validate_access_token)):
+        start = time.perf_counter()
+        for header in stream:
+            fn(header)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>10}: {elapsed / len(stream) * 1e6:7.2f} us/request")
+    print("cache:", token_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Compare IVF recall and latency against the exact scan.
+
+Run from the backend directory:
+
+    python -m scripts.bench_vector_index [--n 5000] [--dim 384] [--k 5] [--nprobe 1 2 4 8 16]
+
+Uses synthetic clustered embeddings (diary entries tend to cluster by topic),
+so it needs no database or embedding model.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.vector_cache import build_user_vectors
+from app.services.vector_index import IVFUserIndex
+
+
+def clustered_vectors(n: int, dim: int, topics: int, rng) -> np.ndarray:
+    centers = rng.normal(size=(topics, dim))
+    labels = rng.integers(0, topics, size=n)
+    return (centers[labels] + 0.6 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--topics", type=int, default=50)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    data = clustered_vectors(args.n, args.dim, args.topics, rng)
+    queries = clustered_vectors(args.queries, args.dim, args.topics, rng)
+    vectors = build_user_vectors(list(enumerate(data)))
+
+    start = time.perf_counter()
+    truth = [{i for i, _ in vectors.top_k(q, args.k)} for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / args.queries
+
+    start = time.perf_counter()
+    index = IVFUserIndex.train(vectors, min_train=0)
+    train_s = time.perf_counter() - start
+
+    print(f"n={args.n} dim={args.dim} k={args.k} lists={len(index.centroids)} train={train_s:.2f}s")
+    print(f"{'backend':<12}{'recall@k':>10}{'ms/query':>10}")
+    print(f"{'exact':<12}{1.0:>10.3f}{exact_ms:>10.3f}")
+    for nprobe in args.nprobe:
+        start = time.perf_counter()
+        found = [{i for i, _ in index.search(q, args.k, nprobe)} for q in queries]
+        ms = (time.perf_counter() - start) * 1000 / args.queries
+        recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth)])
+        print(f"{'ivf/' + str(nprobe):<12}{recall:>10.3f}{ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Check that the hot diary/vector/user queries are served by indexes.
+
+Run from the backend directory:
+
+    python -m scripts.check_query_plans
+
+Migrates a scratch SQLite database to head, runs EXPLAIN QUERY PLAN for
+each query and fails (exit status 1) if any of them scans a whole table
+or builds a temporary sort instead of using an index.
+"""
+import os
+import sys
+import tempfile
+from datetime import date
+
+from sqlalchemy import String, cast, func, select, tuple_
+from sqlalchemy.dialects import sqlite
+
+from app.db import make_engine, run_migrations
+from app.models import Diary, DiaryVector, DiaryVersion, User, UserCounter, UserRole
+from app.services.diary_search import BM25_QUERY
+
+HOT_QUERIES = {
+    "diary entry by user and date": select(Diary).where(Diary.user_id == 1, Diary.date == date(2024, 1, 1)),
+    "diary dates for user": select(Diary.date).distinct().where(Diary.user_id == 1).order_by(Diary.date.desc()),
+    "diary range page": select(Diary.id, Diary.date, Diary.content).where(
+        Diary.user_id == 1, Diary.date >= date(2024, 1, 1), Diary.date <= date(2024, 12, 31),
+        tuple_(Diary.date, Diary.id) > tuple_(date(2024, 3, 1), 10),
+    ).order_by(Diary.date, Diary.id).limit(51),
+    "diary calendar": select(func.substr(cast(Diary.date, String), 1, 7), func.count())
+    .where(Diary.user_id == 1).group_by(func.substr(cast(Diary.date, String), 1, 7)),
+    "diary entries for user": select(Diary.id, Diary.content).where(Diary.user_id == 1, Diary.id.in_([1, 2, 3])),
+    "vector by diary entry": select(DiaryVector).where(DiaryVector.diary_id.in_([1, 2, 3])),
+    "vectors for user": select(DiaryVector.diary_id, DiaryVector.vector).where(DiaryVector.user_id == 1),
+    "diary version for user": select(DiaryVersion.version).where(DiaryVersion.user_id == 1),
+    "users page": select(User).where(User.id > 100).order_by(User.id).limit(10),
+    "users by role page": select(User).where(User.role == UserRole.ADMIN, User.id > 100).order_by(User.id).limit(10),
+    "user counter": select(UserCounter.count).where(UserCounter.name == "total"),
+    "diary keyword search": BM25_QUERY.bindparams(query='"priya"', user_id=1, limit=50),
+}
+
+# Steps accepted for specific queries: grouping one user's index range by month
+# needs a small temp b-tree, bounded by that user's entry count
+ALLOWED = {
+    "diary calendar": {"USE TEMP B-TREE FOR GROUP BY"},
+    # The FTS5 MATCH is an index lookup reported as a virtual table scan; sorting by BM25
+    # rank needs a temp b-tree, bounded by the number of matching entries
+    "diary keyword search": {"SCAN diary_fts VIRTUAL TABLE INDEX 0:M1", "USE TEMP B-TREE FOR ORDER BY"},
+}
+
+
+def plan_problems(plan: list[str], allowed: set = frozenset()) -> list[str]:
+    problems = []
+    for step in plan:
+        if step in allowed:
+            continue
+        # "SCAN t USING INDEX ..." walks an index in order, which is fine; a bare "SCAN t" is not
+        if step.startswith("SCAN") and "USING" not in step:
+            problems.append(step)
+        if "USE TEMP B-TREE" in step:
+            problems.append(step)
+    return problems
+
+
+def main() -> int:
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'plans.db')}"
+        run_migrations(url)
+        engine = make_engine(url, echo=False)
+        with engine.connect() as conn:
+            for name, stmt in HOT_QUERIES.items():
+                sql = str(stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+                plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+                problems = plan_problems(plan, ALLOWED.get(name, set()))
+                failed |= bool(problems)
+                print(f"{'FAIL' if problems else 'ok':>4}  {name}: {' | '.join(plan)}")
+        engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
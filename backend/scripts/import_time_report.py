@@ -0,0 +1,84 @@
+"""Report how long worker boot takes and what it imports.
+
+Run from the backend directory:
+
+    python -m scripts.import_time_report [--top 15] [--repeat 5]
+
+Each measurement runs in a fresh interpreter. It shows the cost of
+`import app.main` (what every worker pays), which heavy modules that import
+pulls in, and the cost of loading the embedder and LLM client, which is now
+deferred to the lifespan warm-up or the first RAG request.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY = ["sentence_transformers", "torch", "transformers", "openai"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+{stmt}
+elapsed = time.perf_counter() - start
+print(f"{{elapsed:.4f}}")
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def run_probe(stmt: str, repeat: int) -> tuple[float, list[str]]:
+    """Median wall time of `stmt` over `repeat` fresh interpreters, plus heavy modules it loaded."""
+    code = PROBE.format(stmt=stmt, heavy=HEAVY)
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split("\n")
+        times.append(float(out[-3]))
+    return statistics.median(times), [m for m in out[-2].split(",") if m]
+
+
+def top_imports(stmt: str, top: int) -> list[tuple[int, str]]:
+    """Parse `-X importtime` output into (cumulative microseconds, module), slowest first."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", stmt], capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # nesting is shown as two extra spaces per level; keep the first two levels
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    boot_s, boot_heavy = run_probe("import app.main", args.repeat)
+    print(f"import app.main: {boot_s * 1000:.0f} ms")
+    print(f"  heavy modules imported: {', '.join(boot_heavy) or 'none'}")
+
+    load_s, _ = run_probe(
+        "import app.main\n"
+        "import openai\n"
+        "from app.core.clients import get_embedder\n"
+        "get_embedder()",
+        args.repeat,
+    )
+    deferred = load_s - boot_s
+    print(f"import app.main + load embedder/LLM client: {load_s * 1000:.0f} ms")
+    print(f"  deferred out of worker boot: {deferred * 1000:.0f} ms ({deferred / load_s:.0%} of eager startup)")
+
+    print("\nSlowest imports under app.main (cumulative):")
+    for us, name in top_imports("import app.main", args.top):
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    main()
+    print(f"\nreport took {time.perf_counter() - started:.1f} s")
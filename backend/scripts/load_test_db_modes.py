@@ -0,0 +1,153 @@
+"""Load test diary reads/writes through sync Session vs. AsyncSession endpoints.
+
+Run from the backend directory:
+
+    python -m scripts.load_test_db_modes [--concurrency 10 100 400] [--requests 4000]
+
+Builds a small app exposing the same diary operations twice: plain `def`
+endpoints over DiaryService (run in FastAPI's threadpool) and `async def`
+endpoints over AsyncDiaryService. Requests are driven in-process through
+httpx's ASGI transport at several concurrency levels; 10% are writes that
+bump the user's diary version. Reports requests/second and latency.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db import Base, async_url, make_async_engine, make_engine
+from app.models import Diary, User
+from app.services.diary_service import AsyncDiaryService, DiaryService
+
+
+def build_app(url: str) -> tuple[FastAPI, list]:
+    engine = make_engine(url, echo=False)
+    async_engine = make_async_engine(async_url(url), echo=False)
+    SyncSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    AsyncSessionMaker = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def get_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSessionMaker() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/sync/{user_id}/{entry_date}")
+    def sync_read(user_id: int, entry_date: date, db: Session = Depends(get_db)):
+        dates = DiaryService.get_dates_for_user(db, user_id)
+        return {"dates": len(dates), "content": DiaryService.get_entry_by_user_and_date(db, user_id, entry_date).content}
+
+    @app.post("/sync/{user_id}")
+    def sync_write(user_id: int, db: Session = Depends(get_db)):
+        DiaryService.bump_version(db, user_id)
+        db.commit()
+        return {"ok": True}
+
+    @app.get("/async/{user_id}/{entry_date}")
+    async def async_read(user_id: int, entry_date: date, db: AsyncSession = Depends(get_async_db)):
+        dates = await AsyncDiaryService.get_dates_for_user(db, user_id)
+        entry = await AsyncDiaryService.get_entry_by_user_and_date(db, user_id, entry_date)
+        return {"dates": len(dates), "content": entry.content}
+
+    @app.post("/async/{user_id}")
+    async def async_write(user_id: int, db: AsyncSession = Depends(get_async_db)):
+        await AsyncDiaryService.bump_version(db, user_id)
+        await db.commit()
+        return {"ok": True}
+
+    return app, [engine, async_engine]
+
+
+def seed(url: str, users: int, days: int):
+    engine = make_engine(url, echo=False)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([User(name=f"user{i}", email=f"user{i}@example.com", password="x") for i in range(users)])
+    db.flush()
+    start = date(2024, 1, 1)
+    db.add_all([
+        Diary(user_id=u, date=start + timedelta(days=d), content=f"day {d} " * 30)
+        for u in range(1, users + 1) for d in range(days)
+    ])
+    db.commit()
+    db.close()
+    engine.dispose()
+
+
+async def drive(app: FastAPI, mode: str, concurrency: int, total: int, users: int, days: int) -> dict:
+    rng = random.Random(0)
+    latencies = []
+    queue = asyncio.Queue()
+    for _ in range(total):
+        user_id = rng.randint(1, users)
+        if rng.random() < 0.1:
+            queue.put_nowait(("POST", f"/{mode}/{user_id}"))
+        else:
+            day = date(2024, 1, 1) + timedelta(days=rng.randrange(days))
+            queue.put_nowait(("GET", f"/{mode}/{user_id}/{day.isoformat()}"))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                method, path = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.request(method, path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    q = statistics.quantiles(latencies, n=100)
+    return {"req/s": total / elapsed, "p50 ms": q[49] * 1000, "p95 ms": q[94] * 1000, "p99 ms": q[98] * 1000}
+
+
+async def run_all(app: FastAPI, args):
+    print(f"{'mode':>6} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for concurrency in args.concurrency:
+        for mode in ("sync", "async"):
+            r = await drive(app, mode, concurrency, args.requests, args.users, args.days)
+            print(f"{mode:>6} {concurrency:>5} {r['req/s']:>8.1f} {r['p50 ms']:>8.1f} {r['p95 ms']:>8.1f} {r['p99 ms']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 400])
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'load.db')}"
+        seed(url, args.users, args.days)
+        app, (engine, async_engine) = build_app(url)
+
+        async def run():
+            await run_all(app, args)
+            await async_engine.dispose()
+
+        asyncio.run(run())
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
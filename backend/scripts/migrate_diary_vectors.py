@@ -0,0 +1,126 @@
+"""Bring an existing diary_vectors table up to the current model.
+
+Run from the backend directory:
+
+    python -m scripts.migrate_diary_vectors [--batch-size 500] [--dtype float16]
+
+Tables still holding JSON text embeddings are converted to binary blobs: the
+legacy table is renamed aside and the new table is created from the model in
+one transaction, then rows are copied over in batches (one transaction per
+batch). Re-running after an interruption resumes from the last copied id. Columns added to the model
+since (e.g. content_hash, dirty) are then added in place.
+"""
+import argparse
+import json
+
+from sqlalchemy import DateTime, inspect, text
+
+from app.core.config import settings
+from app.db import engine
+from app.models import DiaryVector
+from app.utils.vector_codec import VectorCodec
+
+LEGACY_TABLE = "diary_vectors_legacy"
+
+
+def add_missing_columns() -> list[str]:
+    columns = {c["name"] for c in inspect(engine).get_columns("diary_vectors")}
+    added = []
+    with engine.begin() as conn:
+        for column in DiaryVector.__table__.columns:
+            if column.name in columns:
+                continue
+            ddl = f"ALTER TABLE diary_vectors ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+            if column.server_default is not None:
+                ddl += f" NOT NULL DEFAULT {column.server_default.arg}"
+            conn.execute(text(ddl))
+            added.append(column.name)
+    return added
+
+
+def swap_in_new_table(rename: bool):
+    """Move the legacy table aside and create the new one, all in one transaction.
+
+    pysqlite commits DDL on its own unless the transaction is begun explicitly,
+    so a failure half way would otherwise leave no diary_vectors table.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("BEGIN")
+        try:
+            if rename:
+                conn.execute(text(f"ALTER TABLE diary_vectors RENAME TO {LEGACY_TABLE}"))
+            # Index names are global in SQLite; free them for the new table
+            names = conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name=:t AND sql IS NOT NULL"),
+                {"t": LEGACY_TABLE},
+            ).scalars().all()
+            for name in names:
+                conn.execute(text(f'DROP INDEX "{name}"'))
+            DiaryVector.__table__.create(bind=conn)
+            conn.exec_driver_sql("COMMIT")
+        except Exception:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+
+
+def migrate(batch_size: int, dtype: str) -> int:
+    insp = inspect(engine)
+    tables = insp.get_table_names()
+    if LEGACY_TABLE not in tables:
+        if "diary_vectors" not in tables:
+            print("No diary_vectors table; nothing to migrate")
+            return 0
+        columns = {c["name"] for c in insp.get_columns("diary_vectors")}
+        if "embedding" not in columns:
+            print(f"diary_vectors already uses binary storage; added columns: {add_missing_columns()}")
+            return 0
+        swap_in_new_table(rename=True)
+    elif "diary_vectors" not in tables:
+        # Left behind by an older version of this script that failed after the rename
+        swap_in_new_table(rename=False)
+
+    with engine.connect() as conn:
+        last_id = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM diary_vectors")).scalar()
+
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(
+                    f"SELECT id, diary_id, user_id, embedding, created_at FROM {LEGACY_TABLE} "
+                    "WHERE id > :last ORDER BY id LIMIT :n"
+                ).columns(created_at=DateTime),
+                {"last": last_id, "n": batch_size},
+            ).all()
+            if not rows:
+                break
+            payload = []
+            for row in rows:
+                emb = json.loads(row.embedding)
+                payload.append({
+                    "id": row.id,
+                    "diary_id": row.diary_id,
+                    "user_id": row.user_id,
+                    "vector": VectorCodec.encode(emb, dtype),
+                    "dim": len(emb),
+                    "dtype": dtype,
+                    "model": settings.EMBEDDING_MODEL,
+                    "created_at": row.created_at,
+                })
+            conn.execute(DiaryVector.__table__.insert(), payload)
+        last_id = rows[-1].id
+        total += len(rows)
+        print(f"Converted {total} rows (last id {last_id})")
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default=settings.EMBEDDING_STORAGE_DTYPE)
+    args = parser.parse_args()
+    count = migrate(args.batch_size, args.dtype)
+    print(f"Done: {count} vectors migrated")
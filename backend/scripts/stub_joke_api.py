@@ -0,0 +1,28 @@
+"""Local stand-in for the official joke API, for exercising JokesService.
+
+Run from the backend directory, then point the app at it:
+
+    uvicorn scripts.stub_joke_api:app --port 8055 [--env-file ...]
+    JOKES_API_URL=http://127.0.0.1:8055/random_joke uvicorn app.main:app
+
+STUB_JOKE_DELAY (seconds) and STUB_JOKE_FAIL_RATE (0..1) simulate a slow or
+flaky upstream so the prefetch buffer and local fallback can be observed.
+"""
+import asyncio
+import itertools
+import os
+import random
+
+from fastapi import FastAPI, HTTPException
+
+app = FastAPI(title="Stub joke API")
+_ids = itertools.count(1)
+
+
+@app.get("/random_joke")
+async def random_joke():
+    await asyncio.sleep(float(os.getenv("STUB_JOKE_DELAY", "0")))
+    if random.random() < float(os.getenv("STUB_JOKE_FAIL_RATE", "0")):
+        raise HTTPException(status_code=503, detail="stub failure")
+    n = next(_ids)
+    return {"id": n, "type": "general", "setup": f"Stub setup #{n}", "punchline": f"Stub punchline #{n}"}
@@ -0,0 +1,89 @@
+import os
+import tempfile
+
+# Settings are read at import time: point the app at a scratch database and keep bcrypt cheap and in-process
+_tmp = tempfile.mkdtemp(prefix="heybuddy-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp, 'app.db')}")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("BCRYPT_WORKERS", "0")
+os.environ.setdefault("RAG_REINDEX_DEBOUNCE_SECONDS", "3600")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+os.environ.setdefault("JWT_SECRET", "test-secret-that-is-at-least-32-bytes")
+
+import numpy as np
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.db import make_engine, run_migrations
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    run_migrations(url)
+    return url
+
+
+@pytest.fixture
+def engine(db_url):
+    engine = make_engine(db_url, echo=False)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session
+    session.close()
+
+
+class FakeEmbedder:
+    """Deterministic stand-in for SentenceTransformer: one pseudo-random vector per text."""
+
+    def __init__(self, dim: int = 16):
+        self.dim = dim
+        self.encoded = 0
+
+    def encode(self, texts, **kwargs):
+        self.encoded += len(texts)
+        return np.stack([
+            np.random.default_rng(abs(hash(t)) % (2 ** 32)).normal(size=self.dim).astype(np.float32)
+            for t in texts
+        ])
+
+
+@pytest.fixture
+def fake_embedder(monkeypatch):
+    from app.core import clients
+    from app.services.answer_cache import answer_cache
+    from app.services.embedding_cache import embedding_cache
+    from app.services.vector_index import vector_index
+
+    embedder = FakeEmbedder()
+    monkeypatch.setattr(clients, "_embedder", embedder)
+    monkeypatch.setattr(clients, "_embedder_loaded", True)
+    embedding_cache.clear()
+    vector_index.invalidate()
+    yield embedder
+    embedding_cache.clear()
+    vector_index.invalidate()
+    answer_cache.__init__(answer_cache.threshold, answer_cache.ttl, answer_cache.max_entries)
+
+
+@pytest.fixture
+def no_embedder(monkeypatch):
+    from app.core import clients
+
+    monkeypatch.setattr(clients, "_embedder", None)
+    monkeypatch.setattr(clients, "_embedder_loaded", True)
+
+
+@pytest.fixture(scope="session")
+def app_db():
+    """The app's own DATABASE_URL, migrated once, for services that open SessionLocal themselves."""
+    from app.core.config import settings
+    from app.db import SessionLocal
+
+    run_migrations(settings.DATABASE_URL)
+    return SessionLocal
@@ -0,0 +1,66 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services import chat_service
+from app.services.chat_service import ALERT_MARKER, ChatService
+
+SUPPORTIVE_REPLY = ["If this feels like a crisis, ", "please reach out for urgent help. ", "You matter."]
+
+
+class FakeStream:
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    async def __aiter__(self):
+        for token in self.tokens:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def reply(monkeypatch):
+    tokens = []
+
+    async def create(**kwargs):
+        return FakeStream(tokens)
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(chat_service, "get_async_openai_client", lambda: client)
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "test")
+    return tokens
+
+
+def run_chat(message: str) -> list[str]:
+    async def collect():
+        return [chunk async for chunk in ChatService.chat(message, [])]
+    return asyncio.run(collect())
+
+
+def test_user_message_raises_alert(reply):
+    reply.extend(["I'm here for you."])
+    chunks = run_chat("I feel hopeless")
+    assert chunks[0] == ALERT_MARKER
+    assert chunks[-1] == "|ALERT|true|"
+
+
+def test_supportive_reply_does_not_raise_alert(reply, monkeypatch):
+    reply.extend(SUPPORTIVE_REPLY)
+    assert settings.CRISIS_SCAN_RESPONSE is False
+    assert run_chat("Rough day at work")[-1] == "|ALERT|false|"
+
+    # Even with response scanning on, generic support wording is not an alert
+    monkeypatch.setattr(settings, "CRISIS_SCAN_RESPONSE", True)
+    assert run_chat("Rough day at work")[-1] == "|ALERT|false|"
+
+
+def test_response_scan_catches_explicit_phrases(reply, monkeypatch):
+    monkeypatch.setattr(settings, "CRISIS_SCAN_RESPONSE", True)
+    reply.extend(["You said you want to ki", "ll myself; ", "please call someone now."])
+    chunks = run_chat("Rough day at work")
+    assert ALERT_MARKER in chunks[:-1]
+    assert chunks[-1] == "|ALERT|true|"
@@ -0,0 +1,66 @@
+import asyncio
+
+from app.services.chat_context import ContextBuilder, ContextMetrics
+
+SYSTEM = "system prompt"
+
+
+def history(count: int) -> list[dict]:
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + "word " * 40} for i in range(count)]
+
+
+def make_builder(summarize) -> ContextBuilder:
+    builder = ContextBuilder(budget=300, keep_ratio=0.5, cache_size=10, metrics=ContextMetrics())
+    builder._summarize = summarize
+    return builder
+
+
+def test_summary_runs_in_the_background():
+    release = asyncio.Event()
+
+    async def summarize(previous, turns):
+        await release.wait()
+        return f"summary of {len(turns)} turns"
+
+    async def main():
+        builder = make_builder(summarize)
+        turns = history(12)
+        # Returns while the summarizer is still blocked: no LLM round trip before the reply
+        messages, stats = await asyncio.wait_for(builder.build(SYSTEM, "hi", turns, "k"), 1)
+        assert stats.summary_scheduled
+        assert not any(m["content"].startswith("Summary of") for m in messages)
+        assert sum(1 for m in messages if m["content"].startswith("turn")) == 12 - stats.summarized_turns
+
+        release.set()
+        await builder.wait_for_refreshes()
+        messages, stats = await builder.build(SYSTEM, "hi", turns + history(1), "k")
+        assert messages[1]["content"].startswith("Summary of the earlier conversation: summary of")
+        return builder.metrics.snapshot()
+
+    snapshot = asyncio.run(main())
+    assert snapshot["summary_updates"] == 1
+    assert snapshot["summary_failures"] == 0
+
+
+def test_summary_failures_are_counted():
+    async def summarize(previous, turns):
+        raise RuntimeError("LLM down")
+
+    async def main():
+        builder = make_builder(summarize)
+        messages, stats = await builder.build(SYSTEM, "hi", history(12), "k")
+        await builder.wait_for_refreshes()
+        assert messages[-1] == {"role": "user", "content": "hi"}
+        return builder.metrics.snapshot()
+
+    snapshot = asyncio.run(main())
+    assert snapshot["summary_failures"] == 1
+    assert snapshot["summary_updates"] == 0
+
+
+def test_short_history_is_sent_as_is():
+    async def summarize(previous, turns):
+        raise AssertionError("not needed")
+
+    messages, stats = asyncio.run(make_builder(summarize).build(SYSTEM, "hi", history(2), "k"))
+    assert len(messages) == 4 and not stats.summary_scheduled
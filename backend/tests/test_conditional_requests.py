@@ -0,0 +1,65 @@
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import User
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def user_id(app_db):
+    db = app_db()
+    user = User(name="d", email=f"d{id(db)}@example.com", password="x")
+    db.add(user)
+    db.commit()
+    yield user.id
+    db.close()
+
+
+def test_dates_ignore_if_modified_since_after_same_second_write(client, user_id):
+    first = client.get(f"/diary/dates/{user_id}")
+    assert first.status_code == 200
+    assert "last-modified" not in first.headers
+    # A client that only has a timestamp from the same second as the next write
+    since = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=1), usegmt=True)
+
+    created = client.post("/diary/", json={"user_id": user_id, "date": "2026-01-02", "content": "new"})
+    assert created.status_code == 201
+
+    again = client.get(f"/diary/dates/{user_id}", headers={"If-Modified-Since": since})
+    assert again.status_code == 200
+    assert again.json() == {"dates": ["2026-01-02"]}
+
+
+def test_entry_etag_revalidates_until_a_write(client, user_id):
+    client.post("/diary/", json={"user_id": user_id, "date": "2026-01-03", "content": "one"})
+    first = client.get(f"/diary/{user_id}/2026-01-03")
+    etag = first.headers["etag"]
+    assert client.get(f"/diary/{user_id}/2026-01-03", headers={"If-None-Match": etag}).status_code == 304
+
+    entry_id = first.json()["id"]
+    client.put(f"/diary/{entry_id}", json={"content": "two"})
+    changed = client.get(f"/diary/{user_id}/2026-01-03", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["content"] == "two"
+
+
+def test_user_ignores_if_modified_since_after_same_second_update(client, user_id):
+    first = client.get(f"/users/users/{user_id}")
+    assert first.status_code == 200
+    assert "last-modified" not in first.headers
+    since = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=1), usegmt=True)
+
+    assert client.put(f"/users/users/{user_id}", json={"name": "renamed"}).status_code == 200
+
+    again = client.get(f"/users/users/{user_id}", headers={"If-Modified-Since": since})
+    assert again.status_code == 200
+    assert again.json()["name"] == "renamed"
+    assert client.get(f"/users/users/{user_id}", headers={"If-None-Match": again.headers["etag"]}).status_code == 304
@@ -0,0 +1,70 @@
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.core.jwt_manager import JWTManager
+from app.main import app
+from app.models import User
+from app.services import conversation_service
+from app.services.conversation_service import ConversationService
+
+
+@pytest.fixture
+def user_id(app_db):
+    db = app_db()
+    user = User(name="c", email=f"c{id(db)}@example.com", password="x")
+    db.add(user)
+    db.commit()
+    yield user.id
+    db.close()
+
+
+def delete_user(app_db, user_id: int):
+    db = app_db()
+    db.execute(User.__table__.delete().where(User.id == user_id))
+    db.commit()
+    db.close()
+
+
+def test_create_without_user_in_token_is_401(app_db):
+    with pytest.raises(HTTPException) as exc:
+        ConversationService.create(None)
+    assert exc.value.status_code == 401
+
+
+def test_create_for_missing_user_is_404(app_db):
+    with pytest.raises(HTTPException) as exc:
+        ConversationService.create(10 ** 9)
+    assert exc.value.status_code == 404
+
+
+def test_append_after_user_deleted_is_404(app_db, user_id):
+    conversation_id = ConversationService.create(user_id)
+    ConversationService.append_exchange(conversation_id, user_id, "hi", "hello")
+    assert len(ConversationService.get_history(conversation_id, user_id)) == 2
+
+    delete_user(app_db, user_id)
+    with pytest.raises(HTTPException) as exc:
+        ConversationService.append_exchange(conversation_id, user_id, "still there?", "yes")
+    assert exc.value.status_code == 404
+    with pytest.raises(HTTPException):
+        ConversationService.get_history(conversation_id, user_id)
+
+
+def test_create_endpoint_for_deleted_user(app_db, user_id):
+    token = JWTManager.create_access_token({"user_id": user_id})
+    delete_user(app_db, user_id)
+    response = TestClient(app).post("/chat/conversations", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 404
+
+
+def test_get_history_when_the_cache_keeps_nothing(app_db, user_id, monkeypatch):
+    conversation_id = ConversationService.create(user_id)
+    ConversationService.append_exchange(conversation_id, user_id, "hi", "hello")
+    monkeypatch.setattr(conversation_service.conversation_cache, "max_entries", 0)
+    conversation_service.conversation_cache.discard(conversation_id)
+
+    assert [m["content"] for m in ConversationService.get_history(conversation_id, user_id)] == ["hi", "hello"]
+    with pytest.raises(HTTPException) as exc:
+        ConversationService.get_history(conversation_id, user_id + 1)
+    assert exc.value.status_code == 404
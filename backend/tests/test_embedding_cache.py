@@ -0,0 +1,32 @@
+import numpy as np
+
+from app.core.config import settings
+from app.services.embedding_cache import EmbeddingCache, cache_key, model_is_uncased
+
+
+def test_uncased_model_folds_case():
+    cache = EmbeddingCache("all-MiniLM-L6-v2", 10)
+    assert cache.casefold
+    cache.put_many(["Priya called"], [np.ones(3)])
+    assert cache.get_many(["priya  called "])[0] is not None
+
+
+def test_cased_model_keeps_case_apart():
+    cache = EmbeddingCache("some-org/cased-model", 10)
+    assert not cache.casefold
+    cache.put_many(["Priya called"], [np.ones(3)])
+    assert cache.get_many(["priya called"]) == [None]
+    assert cache.get_many(["Priya  called"])[0] is not None
+
+
+def test_keys_include_model_and_case_mode():
+    assert cache_key("a", "x") != cache_key("b", "x")
+    assert cache_key("a", "x") != cache_key("a", "x", casefold=False)
+
+
+def test_setting_overrides_model_list(monkeypatch):
+    assert model_is_uncased("sentence-transformers/all-MiniLM-L6-v2")
+    monkeypatch.setattr(settings, "EMBEDDING_CASE_INSENSITIVE", "false")
+    assert not model_is_uncased("all-MiniLM-L6-v2")
+    monkeypatch.setattr(settings, "EMBEDDING_CASE_INSENSITIVE", "true")
+    assert model_is_uncased("some-org/cased-model")
@@ -0,0 +1,90 @@
+import json
+
+import numpy as np
+import pytest
+from sqlalchemy import inspect, text
+
+from app.db import make_engine, run_migrations
+from app.utils.vector_codec import VectorCodec
+from scripts import migrate_diary_vectors
+
+# diary_vectors and its parents as create_all made them before migrations existed
+BASELINE_SCHEMA = [
+    """CREATE TABLE users (
+        id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, email VARCHAR(255) NOT NULL,
+        password VARCHAR(255) NOT NULL, age INTEGER, role VARCHAR(9) NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL, updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL)""",
+    "CREATE INDEX ix_users_id ON users (id)",
+    "CREATE INDEX ix_users_name ON users (name)",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    """CREATE TABLE diary_entries (
+        id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id), date DATE NOT NULL,
+        content TEXT NOT NULL, created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL)""",
+    "CREATE INDEX ix_diary_entries_id ON diary_entries (id)",
+    "CREATE INDEX ix_diary_entries_user_id ON diary_entries (user_id)",
+    "CREATE INDEX ix_diary_entries_date ON diary_entries (date)",
+    """CREATE TABLE diary_vectors (
+        id INTEGER PRIMARY KEY, diary_id INTEGER NOT NULL REFERENCES diary_entries (id),
+        user_id INTEGER NOT NULL REFERENCES users (id), embedding VARCHAR NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL)""",
+    "CREATE INDEX ix_diary_vectors_id ON diary_vectors (id)",
+    "CREATE INDEX ix_diary_vectors_diary_id ON diary_vectors (diary_id)",
+    "CREATE INDEX ix_diary_vectors_user_id ON diary_vectors (user_id)",
+]
+
+EMBEDDINGS = [[0.5, -1.0, 2.0], [1.0, 0.0, 0.25], [-0.5, 0.75, 1.5]]
+
+
+@pytest.fixture
+def legacy_engine(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    engine = make_engine(url, echo=False)
+    with engine.begin() as conn:
+        for ddl in BASELINE_SCHEMA:
+            conn.execute(text(ddl))
+        conn.execute(text("INSERT INTO users (id, name, email, password, role) VALUES (1, 'a', 'a@x', 'x', 'USER')"))
+        for i, emb in enumerate(EMBEDDINGS, start=1):
+            conn.execute(text("INSERT INTO diary_entries (id, user_id, date, content) VALUES (:i, 1, :d, 'c')"),
+                         {"i": i, "d": f"2024-01-0{i}"})
+            conn.execute(text("INSERT INTO diary_vectors (id, diary_id, user_id, embedding) VALUES (:i, :i, 1, :e)"),
+                         {"i": i, "e": json.dumps(emb)})
+    monkeypatch.setattr(migrate_diary_vectors, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+def assert_converted(engine):
+    insp = inspect(engine)
+    assert migrate_diary_vectors.LEGACY_TABLE not in insp.get_table_names()
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT diary_id, vector, dtype FROM diary_vectors ORDER BY id")).all()
+    assert [row.diary_id for row in rows] == [1, 2, 3]
+    for row, emb in zip(rows, EMBEDDINGS):
+        np.testing.assert_allclose(VectorCodec.decode(row.vector, row.dtype), emb)
+
+
+def test_migrates_baseline_schema_then_alembic_upgrades(legacy_engine):
+    assert migrate_diary_vectors.migrate(batch_size=2, dtype="float32") == 3
+    assert_converted(legacy_engine)
+    run_migrations(str(legacy_engine.url))
+    assert_converted(legacy_engine)
+
+
+def test_resumes_when_only_the_legacy_table_is_left(legacy_engine):
+    with legacy_engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE diary_vectors RENAME TO {migrate_diary_vectors.LEGACY_TABLE}"))
+    assert migrate_diary_vectors.migrate(batch_size=2, dtype="float32") == 3
+    assert_converted(legacy_engine)
+
+
+def test_failed_swap_leaves_the_legacy_table_in_place(legacy_engine, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(migrate_diary_vectors.DiaryVector.__table__, "create", fail)
+    with pytest.raises(RuntimeError):
+        migrate_diary_vectors.migrate(batch_size=2, dtype="float32")
+    insp = inspect(legacy_engine)
+    assert "embedding" in {c["name"] for c in insp.get_columns("diary_vectors")}
+    assert {i["name"] for i in insp.get_indexes("diary_vectors")} >= {"ix_diary_vectors_diary_id"}
@@ -0,0 +1,47 @@
+from datetime import date
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy.exc import IntegrityError
+
+from app.db import Base
+from app.models import Diary, DiaryVector, User
+
+
+def not_fts(name, type_, parent_names):
+    # diary_fts and its shadow tables are raw SQL in migration 0004, not models
+    return not (type_ == "table" and name.startswith("diary_fts"))
+
+
+def test_models_match_migrations(engine):
+    with engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={"include_name": not_fts})
+        assert compare_metadata(context, Base.metadata) == []
+
+
+def test_duplicate_diary_date_is_rejected(db):
+    user = User(name="a", email="a@example.com", password="x")
+    db.add(user)
+    db.flush()
+    db.add(Diary(user_id=user.id, date=date(2024, 1, 1), content="one"))
+    db.flush()
+    db.add(Diary(user_id=user.id, date=date(2024, 1, 1), content="two"))
+    with pytest.raises(IntegrityError):
+        db.flush()
+
+
+def test_deleting_a_user_cascades(db):
+    user = User(name="a", email="a@example.com", password="x")
+    db.add(user)
+    db.flush()
+    entry = Diary(user_id=user.id, date=date(2024, 1, 1), content="one")
+    db.add(entry)
+    db.flush()
+    db.add(DiaryVector(diary_id=entry.id, user_id=user.id, vector=b"\0" * 4, dim=1, dtype="float32", model="m"))
+    db.commit()
+
+    db.execute(User.__table__.delete().where(User.id == user.id))
+    db.commit()
+    assert db.query(Diary).count() == 0
+    assert db.query(DiaryVector).count() == 0
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.password_pool import PasswordPool
+
+
+def slow(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def test_async_full_queue_is_rejected_with_503():
+    pool = PasswordPool(workers=0, max_queue=0, queue_timeout=0.05)
+
+    async def main():
+        first = asyncio.create_task(pool.run_async(slow, 0.3))
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as exc:
+            await pool.run_async(slow, 0)
+        assert await first == 0.3
+        # The slot is free again once the first job finishes
+        assert await pool.run_async(slow, 0) == 0
+        return exc.value
+
+    error = asyncio.run(main())
+    assert error.status_code == 503
+    assert error.headers == {"Retry-After": "1"}
+    assert pool.stats() == {"workers": 0, "completed": 2, "rejected": 1}
+
+
+def test_async_waiters_hold_no_threads():
+    pool = PasswordPool(workers=1, max_queue=10, queue_timeout=30)
+
+    async def main():
+        threads = threading.active_count()
+        tasks = [asyncio.create_task(pool.hash_async("secret", 6)) for _ in range(10)]
+        await asyncio.sleep(0.05)
+        # Queued jobs await futures; only the executor's own helper threads exist
+        assert threading.active_count() - threads <= 2
+        await asyncio.gather(*tasks)
+
+    try:
+        asyncio.run(main())
+    finally:
+        pool.shutdown()
+
+
+def test_sync_full_queue_is_rejected_with_503():
+    pool = PasswordPool(workers=0, max_queue=0, queue_timeout=0.05)
+    worker = threading.Thread(target=pool.run, args=(slow, 0.3))
+    worker.start()
+    time.sleep(0.01)
+    with pytest.raises(HTTPException) as exc:
+        pool.run(slow, 0)
+    worker.join()
+    assert exc.value.status_code == 503
+
+
+def test_async_hash_and_check_in_worker_process():
+    pool = PasswordPool(workers=1, max_queue=1, queue_timeout=30)
+
+    async def main():
+        hashed = await pool.hash_async("secret", 4)
+        return hashed, await pool.check_async("secret", hashed), await pool.check_async("wrong", hashed)
+
+    try:
+        hashed, good, bad = asyncio.run(main())
+    finally:
+        pool.shutdown()
+    assert hashed.startswith("$2b$04$")
+    assert good and not bad
@@ -0,0 +1,18 @@
+from app.utils.phrase_matcher import PhraseMatcher
+
+
+def test_reports_every_overlapping_phrase():
+    matcher = PhraseMatcher(["he", "she", "his", "hers", "ushers"])
+    assert matcher.search("ushers") == ["she", "he", "ushers", "hers"]
+
+
+def test_normalizes_case_whitespace_and_quotes():
+    matcher = PhraseMatcher(["can't go on"])
+    assert matcher.search("I CAN’T\n  go on") == ["can't go on"]
+
+
+def test_stream_scanner_matches_across_chunks():
+    scanner = PhraseMatcher(["kill myself"]).scanner()
+    assert scanner.feed("I want to ki") == []
+    assert scanner.feed("ll myself") == ["kill myself"]
+    assert scanner.matched == ["kill myself"]
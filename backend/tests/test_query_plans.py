@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy.dialects import sqlite
+
+from scripts.check_query_plans import ALLOWED, HOT_QUERIES, plan_problems
+
+# Index each hot query must be served by
+EXPECTED_INDEX = {
+    "diary entry by user and date": "ix_diary_entries_user_id_date",
+    "diary dates for user": "ix_diary_entries_user_id_date",
+    "diary range page": "ix_diary_entries_user_id_date",
+    "diary calendar": "ix_diary_entries_user_id_date",
+    "diary entries for user": "INTEGER PRIMARY KEY",
+    "vector by diary entry": "ix_diary_vectors_diary_id",
+    "vectors for user": "ix_diary_vectors_user_id",
+    "diary version for user": "INTEGER PRIMARY KEY",
+    "users page": "INTEGER PRIMARY KEY",
+    "users by role page": "ix_users_role_id",
+    "user counter": "sqlite_autoindex_user_counters_1",
+    "diary keyword search": "diary_fts VIRTUAL TABLE INDEX",
+}
+
+
+def query_plan(engine, stmt) -> list[str]:
+    sql = str(stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def test_every_hot_query_has_an_expected_index():
+    assert set(EXPECTED_INDEX) == set(HOT_QUERIES)
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(engine, name):
+    plan = query_plan(engine, HOT_QUERIES[name])
+    assert any(EXPECTED_INDEX[name] in step for step in plan), plan
+    assert plan_problems(plan, ALLOWED.get(name, set())) == []
+
+
+def test_plan_problems_flags_full_scans():
+    assert plan_problems(["SCAN diary_entries"]) == ["SCAN diary_entries"]
+    assert plan_problems(["SCAN users USING INDEX ix_users_role_id"]) == []
+    assert plan_problems(["USE TEMP B-TREE FOR ORDER BY"]) == ["USE TEMP B-TREE FOR ORDER BY"]
@@ -0,0 +1,71 @@
+from datetime import date, timedelta
+
+from app.models import Diary, DiaryVector, User
+from app.services.diary_service import DiaryService
+from app.services.rag_service import RAGService, make_vector
+
+
+def add_user_with_entries(db, count: int) -> User:
+    user = User(name="a", email="a@example.com", password="x")
+    db.add(user)
+    db.flush()
+    db.add_all([
+        Diary(user_id=user.id, date=date(2024, 1, 1) + timedelta(days=i), content=f"entry {i}")
+        for i in range(count)
+    ])
+    db.commit()
+    return user
+
+
+def vector_count(db, user_id: int) -> int:
+    return db.query(DiaryVector).filter(DiaryVector.user_id == user_id).count()
+
+
+def test_reindex_skips_users_without_an_index(db, fake_embedder):
+    user = add_user_with_entries(db, 10)
+    entry = Diary(user_id=user.id, date=date(2025, 1, 1), content="new entry")
+    db.add(entry)
+    db.commit()
+
+    assert RAGService.reindex_entries(db, user.id, [entry.id]) == 0
+    assert vector_count(db, user.id) == 0
+
+    RAGService.ensure_index(db, user.id)
+    assert vector_count(db, user.id) == 11
+
+
+def test_ensure_index_fills_in_partially_indexed_users(db, fake_embedder):
+    user = add_user_with_entries(db, 10)
+    first = db.query(Diary).filter(Diary.user_id == user.id).order_by(Diary.id).first()
+    db.add(make_vector(first.id, user.id, [0.1] * fake_embedder.dim, "stale"))
+    db.commit()
+
+    RAGService.ensure_index(db, user.id)
+    assert vector_count(db, user.id) == 10
+    assert len(RAGService.retrieve_contexts(db, user.id, "entry", top_k=20, mode="vector")) == 10
+
+
+def test_reindex_embeds_new_entries_of_indexed_users(db, fake_embedder):
+    user = add_user_with_entries(db, 3)
+    RAGService.ensure_index(db, user.id)
+    entry = Diary(user_id=user.id, date=date(2025, 1, 1), content="new entry")
+    db.add(entry)
+    db.commit()
+
+    assert RAGService.reindex_entries(db, user.id, [entry.id]) == 1
+    assert vector_count(db, user.id) == 4
+
+
+def test_search_sees_vectors_written_by_another_process(db, fake_embedder):
+    user = add_user_with_entries(db, 3)
+    assert len(RAGService.retrieve_contexts(db, user.id, "entry", top_k=20, mode="vector")) == 3
+
+    # Another worker indexes a new entry: rows and version change, this process's cache is never invalidated
+    entry = Diary(user_id=user.id, date=date(2025, 1, 1), content="new entry")
+    db.add(entry)
+    db.flush()
+    db.add(make_vector(entry.id, user.id, fake_embedder.encode(["new entry"])[0], "h"))
+    DiaryService.bump_version(db, user.id)
+    db.commit()
+
+    assert len(RAGService.retrieve_contexts(db, user.id, "entry", top_k=20, mode="vector")) == 4
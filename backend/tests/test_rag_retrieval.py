@@ -0,0 +1,163 @@
+import json
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.db import get_db
+from app.main import app
+from app.models import Diary, User
+from app.services import rag_service
+from app.services.diary_search import DiarySearch
+from app.services.diary_service import DiaryService
+from app.services.rag_service import RAGService, reciprocal_rank_fusion
+
+TEXTS = [
+    "Had lunch with Priya at the cafe",
+    "Walked in the park, it was sunny",
+    "Priya called about the trip to Lisbon",
+    "Worked late on the report",
+]
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="an answer"))])
+
+
+class FakeStream:
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    async def __aiter__(self):
+        for token in self.tokens:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+    async def close(self):
+        pass
+
+
+class FakeAsyncCompletions:
+    async def create(self, **kwargs):
+        return FakeStream(["an ", "answer"])
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    completions = FakeCompletions()
+    monkeypatch.setattr(rag_service, "get_openai_client", lambda: SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    monkeypatch.setattr(
+        rag_service, "get_async_openai_client",
+        lambda: SimpleNamespace(chat=SimpleNamespace(completions=FakeAsyncCompletions())),
+    )
+    return completions
+
+
+@pytest.fixture
+def user(db):
+    user = User(name="a", email="a@example.com", password="x")
+    db.add(user)
+    db.flush()
+    db.add_all([
+        Diary(user_id=user.id, date=date(2024, 5, 1) + timedelta(days=i), content=text)
+        for i, text in enumerate(TEXTS)
+    ])
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def client(db):
+    app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_default_mode_is_vector(db):
+    assert settings.RAG_RETRIEVAL_MODE == "vector"
+    assert RAGService.resolve_mode(db, None) == "vector"
+
+
+def test_lexical_chat_needs_no_embedder(db, user, llm, no_embedder):
+    answer, contexts, cached = RAGService.query_user_diaries(db, user.id, "When did I mention Priya?", 2, mode="lexical")
+    assert answer == "an answer" and not cached
+    assert {c["date"] for c in contexts} == {"2024-05-01", "2024-05-03"}
+
+
+def test_lexical_chat_endpoints_need_no_embedder(client, user, llm, no_embedder):
+    body = {"user_id": user.id, "question": "Lisbon trip", "mode": "lexical"}
+    response = client.post("/rag/chat", json=body)
+    assert response.status_code == 200, response.text
+    assert [c["date"] for c in response.json()["contexts"]] == ["2024-05-03"]
+
+    response = client.post("/rag/chat/stream", json=body)
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["contexts"][0]["date"] == "2024-05-03"
+    assert lines[-1] == {"text": "", "done": True, "cached": False}
+
+
+def test_bypass_cache_skips_the_answer_cache(db, user, llm, fake_embedder, monkeypatch):
+    def no_key(*args):
+        raise AssertionError("answer cache key computed")
+
+    monkeypatch.setattr(RAGService, "answer_cache_key", staticmethod(no_key))
+    RAGService.query_user_diaries(db, user.id, "park", 2, use_cache=False, mode="vector")
+    assert llm.calls == 1
+
+
+def test_cached_answer_is_per_mode(db, user, llm, fake_embedder):
+    for mode in ("vector", "hybrid", "vector"):
+        RAGService.query_user_diaries(db, user.id, "park", 2, mode=mode)
+    assert llm.calls == 2
+
+
+def test_hybrid_ranks_keyword_matches_first(db, user, fake_embedder):
+    top = RAGService.retrieve_contexts(db, user.id, "Lisbon", top_k=4, mode="hybrid")
+    assert top[0]["date"] == "2024-05-03"
+
+
+def test_fts_index_follows_diary_writes(db, user):
+    def matches(word):
+        return [diary_id for diary_id, _ in DiarySearch.bm25(db, user.id, word, 10)]
+
+    entry = db.query(Diary).filter(Diary.content.like("%report%")).one()
+    assert matches("report") == [entry.id]
+    entry.content = "Dinner in Porto"
+    db.commit()
+    assert matches("report") == [] and matches("porto") == [entry.id]
+    db.delete(entry)
+    db.commit()
+    assert matches("porto") == []
+
+
+def test_fts_query_quotes_terms_and_drops_stopwords():
+    assert DiarySearch.fts_query('When did I mention Priya? NEAR "x" AND *') == '"mention" OR "priya" OR "near" OR "x"'
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[(1, 0.9), (2, 0.8)], [(2, 5.0), (3, 4.0)]], k=60)
+    assert [diary_id for diary_id, _ in fused] == [2, 1, 3]
+
+
+def test_answer_is_cached_under_the_version_it_was_built_from(db, user, llm, fake_embedder, monkeypatch):
+    RAGService.ensure_index(db, user.id)
+    create = llm.create
+
+    def create_while_diary_changes(**kwargs):
+        # A write lands during the LLM round trip
+        DiaryService.bump_version(db, user.id)
+        db.commit()
+        return create(**kwargs)
+
+    monkeypatch.setattr(llm, "create", create_while_diary_changes)
+    RAGService.query_user_diaries(db, user.id, "park", 2, mode="vector")
+    monkeypatch.setattr(llm, "create", create)
+    _, _, cached = RAGService.query_user_diaries(db, user.id, "park", 2, mode="vector")
+    assert not cached
+    assert llm.calls == 2
@@ -0,0 +1,86 @@
+import threading
+
+import numpy as np
+
+from app.services.vector_cache import UserVectorCache, UserVectors, normalize
+from app.services.vector_index import IVFIndex
+
+
+def user_vectors(n: int, dim: int = 8, seed: int = 0) -> UserVectors:
+    matrix = normalize(np.random.default_rng(seed).normal(size=(n, dim))).astype(np.float32)
+    return UserVectors(np.arange(1, n + 1, dtype=np.int64), matrix)
+
+
+def test_slow_rebuild_does_not_block_other_users(tmp_path):
+    index = IVFIndex(str(tmp_path), nprobe=2, min_train=4)
+    vectors = user_vectors(20)
+    query = vectors.matrix[0]
+    index.search(2, 0, query, 3, lambda: vectors)
+
+    loading, release = threading.Event(), threading.Event()
+
+    def slow_loader():
+        loading.set()
+        release.wait(5)
+        return vectors
+
+    rebuild = threading.Thread(target=index.search, args=(1, 0, query, 3, slow_loader))
+    rebuild.start()
+    try:
+        assert loading.wait(5)
+        done = []
+        other = threading.Thread(target=lambda: done.append(index.search(2, 0, query, 3, lambda: vectors)))
+        other.start()
+        other.join(2)
+        assert done and done[0][0][0] == 1
+    finally:
+        release.set()
+        rebuild.join(5)
+
+
+def test_add_retrains_after_doubling(tmp_path):
+    index = IVFIndex(str(tmp_path), nprobe=8, min_train=4)
+    vectors = user_vectors(8)
+    index.search(1, 0, vectors.matrix[0], 1, lambda: vectors)
+
+    extra = user_vectors(8, seed=1)
+    index.add(1, list(extra.diary_ids + 100), extra.matrix)
+    assert index._get(1).trained_size == 16
+    assert index.search(1, 0, extra.matrix[3], 1, lambda: None)[0][0] == 104
+
+    index.invalidate(1)
+    assert not (tmp_path / "user_1.npz").exists()
+
+
+def test_vector_cache_reloads_when_the_version_changes():
+    cache = UserVectorCache(max_bytes=1 << 20)
+    old, new = user_vectors(3), user_vectors(4)
+    assert cache.get(1, 5, lambda: old) is old
+    assert cache.get(1, 5, lambda: new) is old
+    assert cache.get(1, 6, lambda: new) is new
+
+
+def test_vector_cache_keeps_newer_matrix_over_a_slow_stale_load():
+    cache = UserVectorCache(max_bytes=1 << 20)
+    old, new = user_vectors(3), user_vectors(4)
+
+    def slow_stale_loader():
+        # The reindex commits and a newer search caches its matrix meanwhile
+        cache.invalidate(1)
+        cache.get(1, 6, lambda: new)
+        return old
+
+    assert cache.get(1, 5, slow_stale_loader) is old
+    assert cache.get(1, 6, lambda: None) is new
+
+
+def test_add_skips_ids_already_built_from_the_database(tmp_path):
+    index = IVFIndex(str(tmp_path), nprobe=8, min_train=4)
+    vectors = user_vectors(6)
+    # The search after reindex_entries commits already loads the new rows
+    index.search(1, 0, vectors.matrix[0], 1, lambda: vectors)
+    index.add(1, list(vectors.diary_ids[-2:]), vectors.matrix[-2:])
+
+    found = [diary_id for diary_id, _ in index.search(1, 0, vectors.matrix[0], 6, lambda: None)]
+    assert sorted(found) == list(range(1, 7))
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["user_1.npz"]
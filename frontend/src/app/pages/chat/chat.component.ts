@@ -22,6 +22,8 @@ export class ChatComponent implements OnInit {
   inputMessage: string = '';
   loading: boolean = false;
   jokeText: string | null = null;
+  // Server-side conversation: once created, only the new message is sent each turn
+  conversationId: string | null = null;
 
   constructor(
     private authService: AuthService,
@@ -42,6 +44,39 @@ export class ChatComponent implements OnInit {
     this.router.navigate(['/login']);
   }
 
+  private authHeaders(): Record<string, string> {
+    const token = this.authService.getToken();
+    return token ? { 'Authorization': `Bearer ${token}` } : {};
+  }
+
+  private async ensureConversation(): Promise<string | null> {
+    if (this.conversationId) return this.conversationId;
+    try {
+      const res = await fetch('http://localhost:8000/chat/conversations', {
+        method: 'POST',
+        headers: this.authHeaders()
+      });
+      if (res.ok) {
+        this.conversationId = (await res.json()).conversation_id;
+      }
+    } catch (err) {
+      console.error('Could not start a conversation, sending full history instead', err);
+    }
+    return this.conversationId;
+  }
+
+  private postChat(text: string, conversationId: string | null): Promise<Response> {
+    // Without a conversation id, fall back to sending the whole history
+    const body = conversationId
+      ? { message: text, conversation_id: conversationId }
+      : { message: text, history: this.messages.slice(0, -2).map(m => ({ role: m.role, content: m.content })) };
+    return fetch('http://localhost:8000/chat/chat', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', ...this.authHeaders() },
+      body: JSON.stringify(body)
+    });
+  }
+
   async sendMessage(): Promise<void> {
     const text = this.inputMessage?.trim();
     if (!text) return;
@@ -54,15 +89,12 @@ export class ChatComponent implements OnInit {
     this.messages.push({ role: 'assistant', content: '' });
 
     try {
-      const token = this.authService.getToken();
-      const res = await fetch('http://localhost:8000/chat/chat', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          ...(token ? { 'Authorization': `Bearer ${token}` } : {})
-        },
-        body: JSON.stringify({ message: text, history: this.messages.slice(0, -1).map(m => ({ role: m.role, content: m.content })) })
-      });
+      let res = await this.postChat(text, await this.ensureConversation());
+      if (res.status === 404 && this.conversationId) {
+        // The conversation expired or was removed on the server: continue without it
+        this.conversationId = null;
+        res = await this.postChat(text, null);
+      }
 
       if (!res.ok) {
         throw new Error(`HTTP error! status: ${res.status}`);
@@ -92,8 +124,10 @@ export class ChatComponent implements OnInit {
               if (chunk.text) {
                 this.messages[assistantMessageIndex].content += chunk.text;
               }
-              if (chunk.done && chunk.alert !== undefined) {
-                alertFlag = chunk.alert;
+              if (chunk.alert && !alertFlag) {
+                // Crisis alerts can arrive mid-stream; show them right away
+                alertFlag = true;
+                alert('It seems you may need immediate support. Please consider contacting local emergency services or a mental health professional.');
               }
             } catch (parseErr) {
               console.error('Failed to parse chunk:', line, parseErr);
@@ -102,9 +136,6 @@ export class ChatComponent implements OnInit {
         }
       }
 
-      if (alertFlag) {
-        alert('It seems you may need immediate support. Please consider contacting local emergency services or a mental health professional.');
-      }
     } catch (err) {
       console.error(err);
       this.messages[assistantMessageIndex].content = 'Sorry, I\'m having trouble reaching the server. Please try again later.';